@@ -1,4 +1,5 @@
 from imusim.all import *
+from trajectory_reader import read_trajectory, read_manifest
 import numpy as np
 import os
 import sys
@@ -18,18 +19,29 @@ def simulate(filename, fps, params):
 	'''
 	Simulate each sensor and store the data to appropriate output filenames
 	'''
-	store_outputs(filename, run_sim(read_inputs(filename, fps), fps, params))
+	store_outputs(filename, run_sim(read_inputs(filename, fps), fps, params), params)
+
+
+def simulate_all(trajectory_dir, fps, manifest_path):
+	'''
+	Simulate every sensor listed in the manifest, dividing the sensors
+	between worker processes
+	'''
+	manifest = read_manifest(manifest_path)
+	filenames = [os.path.join(trajectory_dir, sensor + '.csv') for sensor, params in manifest]
+	trajectories = [read_inputs(filename, fps) for filename in filenames]
+	results = simulateIMUs(IdealIMU, trajectories, 1.0/fps)
+
+	for filename, (sensor, params), measurements in zip(filenames, manifest, results):
+		accelerometer, magnetometer, gyroscope = measurements
+		store_outputs(filename, select_outputs(accelerometer, gyroscope, params), params)
 
 
 def read_inputs(filename, fps):
 	'''
 	Produce trajectory from sensor position and orientation data
 	'''
-	f = open(filename, 'r').read().strip().split('\n')
-	# Skip the header
-	iterF = iter(f)
-	next(iterF)
-	values = np.array([[float(a) for a in k.split(',')] for k in iterF]).transpose()
+	values = read_trajectory(filename)
 
 	# extract relevant data
 	frames = values[0] # frames
@@ -41,8 +53,11 @@ def read_inputs(filename, fps):
 	position_ts = TimeSeries(timestamps, pos)
 	rotation_ts = TimeSeries(timestamps, QuaternionArray(quat.transpose()))
 
-	# create Splined Trajectory
-	trajectory = SplinedTrajectory(SampledTrajectory(position_ts, rotation_ts))
+	# create Splined Trajectory, reusing splines fitted to the same data by
+	# earlier runs of this simulation
+	cache_dir = dirname(dirname(filename)) + os.sep + 'SplineCache'
+	trajectory = SplinedTrajectory(SampledTrajectory(position_ts, rotation_ts),
+			splineFitter=SplineFitter(cacheDirectory=cache_dir))
 
 	return trajectory
 
@@ -50,28 +65,36 @@ def read_inputs(filename, fps):
 
 def run_sim(trajectory, fps, params):
 	'''
-	Run a simulation of an ideal IMU on trajectory data
+	Run a simulation of an ideal IMU on trajectory data, sampling the
+	whole trajectory at once rather than stepping the event loop
 	'''
 	sim = Simulation()
 	imu = IdealIMU(sim, trajectory)
-	behaviour = BasicIMUBehaviour(imu, 1.0/fps)
 
 	sim.time = trajectory.startTime
-	sim.run(trajectory.endTime)
+	sampleIMU(imu, 1.0/fps, trajectory.endTime)
 	sys.stdout.flush()
 
-	imu_data = imu.accelerometer.rawMeasurements.timestamps
+	return select_outputs(imu.accelerometer.rawMeasurements,
+			imu.gyroscope.rawMeasurements, params)
+
+
+def select_outputs(accelerometer, gyroscope, params):
+	'''
+	Stack the timestamps with the requested accelerometer and gyroscope axes
+	'''
+	imu_data = accelerometer.timestamps
 
 	for p in params:
 		if p.split('_')[1] == 'acc':
-			imu_data = np.vstack((imu_data, imu.accelerometer.rawMeasurements.values[PARAMS[p]]))
+			imu_data = np.vstack((imu_data, accelerometer.values[PARAMS[p]]))
 		else:
-			imu_data = np.vstack((imu_data, imu.gyroscope.rawMeasurements.values[PARAMS[p]]))
+			imu_data = np.vstack((imu_data, gyroscope.values[PARAMS[p]]))
 
 	return imu_data
 
 
-def store_outputs(filename, imu_data):
+def store_outputs(filename, imu_data, params):
 	'''
 	Store output to appropriate filename
 	'''
@@ -94,10 +117,14 @@ def store_outputs(filename, imu_data):
 		np.savetxt(f, imu_data.transpose(), delimiter=',')
 
 '''
-Main function: assume input is <path-to-sensor-data> <frames-per-second> <parameters>
+Main function: assume input is <path-to-sensor-data> <frames-per-second> <parameters>,
+or <path-to-trajectory-folder> <frames-per-second> <path-to-manifest> when run in batch
 '''
 if __name__ == "__main__":
 	sensor_file_path = sys.argv[1]
 	fps = int(sys.argv[2])
-	params = [str(param) for param in sys.argv[3:]] 
-	simulate(sensor_file_path, fps, params)
+	if os.path.isdir(sensor_file_path):
+		simulate_all(sensor_file_path, fps, sys.argv[3])
+	else:
+		params = [str(param) for param in sys.argv[3:]]
+		simulate(sensor_file_path, fps, params)
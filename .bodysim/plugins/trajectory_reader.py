@@ -0,0 +1,80 @@
+'''
+Reads the sensor trajectories and body triangles written by BodySim.
+
+BodySim saves the trajectories of all sensors in a simulation as one binary
+array (trajectory.npy, indexed by [frame][sensor][column]) described by
+trajectory.xml. The array is memory mapped so no parsing is needed. If a
+simulation only has the per sensor csv files, those are parsed instead.
+
+The body is saved as the vertex indices of each triangle (triangles.npy,
+int32 indexed by [triangle][corner]), which are the same for every frame, and
+the location of every vertex in every frame (vertices.npy, float32 indexed by
+[frame][vertex][dimension]), both described by triangles.xml.
+
+Plugins declared with batch="true" in plugins.xml are passed a manifest
+listing every sensor to simulate and its variables.
+'''
+
+import numpy as np
+import os
+from xml.etree.ElementTree import ElementTree as ET
+
+HEADER_FILE = 'trajectory.xml'
+TRIANGLES_HEADER_FILE = 'triangles.xml'
+
+def load_trajectories(trajectory_dir):
+	'''
+	Returns (frames, sensor names, columns, data) for the binary trajectory in
+	trajectory_dir, or None if there is none. data is memory mapped.
+	'''
+	header_path = os.path.join(trajectory_dir, HEADER_FILE)
+	if not os.path.exists(header_path):
+		return None
+
+	header = ET().parse(header_path)
+	frames = np.arange(int(header.attrib['frame_start']),
+					   int(header.attrib['frame_end']) + 1)
+	sensors = [sensor.text for sensor in header.iter('sensor')]
+	columns = [column.text for column in header.iter('column')]
+	data = np.load(os.path.join(trajectory_dir, header.attrib['data']), mmap_mode='r')
+
+	return frames, sensors, columns, data
+
+def read_trajectory(filename):
+	'''
+	Returns the trajectory of one sensor laid out like its csv file, i.e.
+	one row per column: frame, x, y, z, w, rx, ry, rz. filename is the path
+	to the sensor's csv file in the Trajectory folder.
+	'''
+	trajectory_dir = os.path.dirname(filename)
+	sensor = os.path.basename(filename).split('.')[0]
+	trajectories = load_trajectories(trajectory_dir)
+	if trajectories is not None and sensor in trajectories[1]:
+		frames, sensors, columns, data = trajectories
+		return np.vstack((frames, data[:, sensors.index(sensor)].T))
+
+	# Fall back to the csv, skipping the header.
+	return np.loadtxt(filename, delimiter=',', skiprows=1, ndmin=2).transpose()
+
+def load_mesh(triangles_dir):
+	'''
+	Returns (frames, triangles, vertices) for the body in triangles_dir.
+	vertices is memory mapped; vertices[frame][triangles] gives the location
+	of every triangle in a frame.
+	'''
+	header = ET().parse(os.path.join(triangles_dir, TRIANGLES_HEADER_FILE))
+	frames = np.arange(int(header.attrib['frame_start']),
+					   int(header.attrib['frame_end']) + 1)
+	triangles = np.load(os.path.join(triangles_dir, header.attrib['triangles']))
+	vertices = np.load(os.path.join(triangles_dir, header.attrib['vertices']), mmap_mode='r')
+
+	return frames, triangles, vertices
+
+def read_manifest(manifest_path):
+	'''
+	Returns (sensor name, variables) for every sensor in a batch plugin's
+	manifest.
+	'''
+	manifest = ET().parse(manifest_path)
+	return [(sensor.attrib['name'], [variable.text for variable in sensor.iter('variable')])
+			for sensor in manifest.iter('sensor')]
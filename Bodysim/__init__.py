@@ -5,6 +5,7 @@ _modules = [
     "file_operations",
     "current_sensors_panel",
     "graph_operator",
+    "simulator_operator",
     "message_operators",
     "sensor_addition",
     "sensor_operators",
@@ -5,13 +5,29 @@ Contains file writing, reading, and execution methods for simulations and sessio
 import bpy
 import os
 import shutil
+import numpy
 from xml.etree.ElementTree import ElementTree as ET
 from xml.etree.ElementTree import *
 import subprocess
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Thread
 import Bodysim.plugins_info
 import Bodysim.sim_params
 NUMBER_OF_BASE_PLUGINS = 1
 session_element = None
+# Binary trajectory output; data is indexed by [frame][sensor][column].
+TRAJECTORY_DATA_FILE = 'trajectory.npy'
+TRAJECTORY_HEADER_FILE = 'trajectory.xml'
+TRAJECTORY_COLUMNS = ['x', 'y', 'z', 'w', 'rx', 'ry', 'rz']
+# Binary body mesh. Triangles are int32 vertex indices indexed by
+# [triangle][corner] and are the same for every frame; vertices are float32
+# locations indexed by [frame][vertex][dimension].
+TRIANGLES_DATA_FILE = 'triangles.npy'
+VERTICES_DATA_FILE = 'vertices.npy'
+TRIANGLES_HEADER_FILE = 'triangles.xml'
 
 class SimulationState:
     """Acts as an enum to identify the state of the simulation."""
@@ -107,39 +123,83 @@ def update_session_file(session_element, session_path):
         indent(session_element)
         f.write(tostring(session_element))
 
-def execute_simulators(current_sim_path, batched_mode):
-    """Run simulators depending sensor and variables selected."""
+def finish_simulators(jobs, batched_mode):
+    """Reports the outcome of the simulator jobs, then continues the batch
+     if running one.
+    """
+
+    failed = [job.name for job in jobs if job.state == JobState.Failed]
+    for job in jobs:
+        print(job.name + ' exit code ' + str(job.returncode) + ' time ' + str(job.elapsed()))
+
+    if failed:
+        bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Error",
+                                message = 'An external simulation encountered an error: ' +
+                                          ', '.join(failed) + '.')
+        return
+
+    if batched_mode:
+        bpy.ops.bodysim.run_batch('EXEC_DEFAULT')
+    else:
+        bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Sucess!",
+                                message = 'All simulations finished.')
+
+def get_simulator_jobs():
+    """Returns a SimulatorJob for every external simulator that has to be
+     run for the sensors and variables selected. The jobs do not depend on
+     each other so they can be run in any order.
+    """
 
     plugins = Bodysim.plugins_info.plugins
     # Use in case path has spaces
     dbl_quotes = '"'
+    jobs = []
+    # Sensors and variables to simulate for each batch plugin.
+    batch_sensors = {}
     sim_dict, location_map = Bodysim.plugins_info.get_sensor_plugin_mapping()
     for sensor in sim_dict:
         if len(sim_dict[sensor]) > NUMBER_OF_BASE_PLUGINS:
             for simulator in sim_dict[sensor]:
                 # Ignore if BASE plugin
-                if not simulator == 'Trajectory':
-                    command = ("python " + dbl_quotes + bodysim_conf_path
-                               + os.sep + "plugins" + os.sep
-                               + plugins[simulator]['file'] + dbl_quotes)
+                if simulator == 'Trajectory':
+                    continue
+
+                # Batch plugins handle all sensors in one run.
+                if plugins[simulator]['batch']:
+                    batch_sensors.setdefault(simulator, []).append((location_map[sensor],
+                                                                    sim_dict[sensor][simulator]))
+                    continue
+
+                command = ("python " + dbl_quotes + bodysim_conf_path
+                           + os.sep + "plugins" + os.sep
+                           + plugins[simulator]['file'] + dbl_quotes)
+
+                for requirement in plugins[simulator]['requirements']:
+                    command = command + ' ' + Bodysim.sim_params.get_params(requirement, location_map[sensor])
 
-                    for requirement in plugins[simulator]['requirements']:
-                        command = command + ' ' + Bodysim.sim_params.get_params(requirement, location_map[sensor])
+                # Deal with extras
+                for extra in plugins[simulator]['extras']:
+                    command = command + ' ' + Bodysim.sim_params.get_params(extra, location_map[sensor], simulator)
 
-                    # Deal with extras
-                    for extra in plugins[simulator]['extras']:
-                        command = command + ' ' + Bodysim.sim_params.get_params(extra, location_map[sensor], plugin)
+                args = " ".join(sim_dict[sensor][simulator])
+                jobs.append(SimulatorJob(simulator + ' ' + location_map[sensor], command + ' ' + args))
 
-                    args = " ".join(sim_dict[sensor][simulator])
+    for plugin in batch_sensors:
+        command = ("python " + dbl_quotes + bodysim_conf_path
+                   + os.sep + "plugins" + os.sep
+                   + plugins[plugin]['file'] + dbl_quotes)
 
-                    # Run the simulator
-                    try:
-                        subprocess.check_call(command + ' ' + args, shell=True)
+        for requirement in plugins[plugin]['requirements']:
+            command = command + ' ' + Bodysim.sim_params.get_params(requirement, None, plugin)
 
-                    except:
-                        bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Error",
-                                                message = 'An external simulation encountered an error.')
-                        return
+        # Deal with extras
+        for extra in plugins[plugin]['extras']:
+            command = command + ' ' + Bodysim.sim_params.get_params(extra, None, plugin)
+
+        manifest_path = write_plugin_manifest(plugin, batch_sensors[plugin],
+                                              os.path.dirname(Bodysim.sim_params.trajectory_path))
+        jobs.append(SimulatorJob(plugin, command + ' ' + dbl_quotes +
+                                 manifest_path.replace('\\', r'\\') + dbl_quotes))
 
     # Execute "hidden" sims.
     for plugin in plugins:
@@ -159,20 +219,86 @@ def execute_simulators(current_sim_path, batched_mode):
             sensor_loc_to_name = Bodysim.plugins_info.populate_sensor_list()
             sensor_names = [sensor_loc_to_name[i][1] for i in range(len(sim_dict))]
             sensors = " ".join(sensor_names)
+            jobs.append(SimulatorJob(plugin, command + ' ' + sensors))
 
-            try:
-                print(command + ' ' + sensors)
-                subprocess.check_call(command + ' ' + sensors, shell=True)
-            except:
-                bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Error",
-                                        message = 'An external simulation encountered an error.')
-                return
+    return jobs
 
-    if batched_mode:
-        bpy.ops.bodysim.run_batch('EXEC_DEFAULT')
-    else:
-        bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Sucess!",
-                                message = 'All simulations finished.')
+def write_plugin_manifest(plugin, sensors, sim_path):
+    """Writes the manifest passed to a batch plugin, listing the variables
+     to simulate for each (sensor name, variables) in sensors. Returns the
+     path to the manifest.
+    """
+
+    manifest_element = Element('manifest', {'plugin': plugin})
+    for sensor_name, variables in sensors:
+        curr_sensor_element = Element('sensor', {'name': sensor_name})
+        for variable in variables:
+            curr_variable_element = Element('variable')
+            curr_variable_element.text = variable
+            curr_sensor_element.append(curr_variable_element)
+        manifest_element.append(curr_sensor_element)
+
+    indent(manifest_element)
+    manifest_path = sim_path + os.sep + plugin + '_manifest.xml'
+    with open(manifest_path, 'wb') as f:
+        f.write(tostring(manifest_element))
+
+    return manifest_path
+
+def run_simulator_jobs(jobs, max_workers=None):
+    """Runs the jobs concurrently and waits for all of them to finish.
+     Returns the jobs.
+    """
+
+    executor = start_simulator_jobs(jobs, max_workers)[0]
+    executor.shutdown(wait=True)
+    return jobs
+
+def start_simulator_jobs(jobs, max_workers=None):
+    """Starts running the jobs concurrently, at most one per core by default.
+     Each job is its own process; the pool only waits on them. Does not
+     block. Returns the executor and a future per job.
+    """
+
+    max_workers = max_workers or multiprocessing.cpu_count()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    return executor, [executor.submit(job.run) for job in jobs]
+
+class JobState:
+    """Acts as an enum to identify the state of a simulator job."""
+    Queued, Running, Finished, Failed = range(4)
+    names = ['Queued', 'Running', 'Finished', 'Failed']
+
+class SimulatorJob:
+    """A single run of an external simulator and its progress."""
+
+    def __init__(self, name, command):
+        self.name = name
+        self.command = command
+        self.state = JobState.Queued
+        self.returncode = None
+        self.start_time = None
+        self.end_time = None
+
+    def run(self):
+        print(self.command)
+        self.start_time = time.time()
+        self.state = JobState.Running
+        try:
+            self.returncode = subprocess.call(self.command, shell=True)
+        except OSError:
+            self.returncode = -1
+
+        self.end_time = time.time()
+        self.state = JobState.Finished if self.returncode == 0 else JobState.Failed
+        return self
+
+    def elapsed(self):
+        """Seconds the job has been running for, or 0 if not started."""
+        if self.start_time is None:
+            return 0.0
+
+        return (self.end_time or time.time()) - self.start_time
 
 def read_session_file(path, simulation_state):
     """Reads the session file to get a list of simulations."""
@@ -279,9 +405,123 @@ def update_simulation_state(session_path, simulation_name, new_state):
     with open(session_path + '.xml', 'wb') as f:
         f.write(tostring(tree))
 
-def write_results(data, sensor_objects, sim_path):
-    """Writes simulation results to csv file."""
+def write_results(data, sensor_objects, sim_path, frame_start):
+    """Writes simulation results to sim_path. data is indexed by
+     [frame][sensor] and holds the location and rotation of each sensor.
+     The whole array is saved as one binary .npy file that readers can
+     memory map, described by an xml header listing the frames, sensors and
+     columns. Per sensor csv files are also written as an export unless
+     disabled in sim_params.
+    """
+    trajectory_element = Element('trajectory',
+                                 {'data': TRAJECTORY_DATA_FILE,
+                                  'frame_start': str(frame_start),
+                                  'frame_end': str(frame_start + len(data) - 1)})
+    columns_element = Element('columns')
+    for column in TRAJECTORY_COLUMNS:
+        curr_column_element = Element('column')
+        curr_column_element.text = column
+        columns_element.append(curr_column_element)
+
+    sensors_element = Element('sensors')
+    for sensor_object in sensor_objects:
+        curr_sensor_element = Element('sensor')
+        curr_sensor_element.text = sensor_object[1]
+        sensors_element.append(curr_sensor_element)
+
+    trajectory_element.extend([columns_element, sensors_element])
+    indent(trajectory_element)
+    numpy.save(sim_path + os.sep + TRAJECTORY_DATA_FILE, data)
+    with open(sim_path + os.sep + TRAJECTORY_HEADER_FILE, 'wb') as f:
+        f.write(tostring(trajectory_element))
+
+    if not Bodysim.sim_params.write_trajectory_csv:
+        return
+
+    frames = numpy.arange(frame_start, frame_start + len(data))
     for i in range(len(sensor_objects)):
-        with open(sim_path + os.sep + sensor_objects[i][1] + '.csv', 'w') as f:
-            for output_line in data[i]:
-                f.write(output_line);
+        with open(sim_path + os.sep + sensor_objects[i][1] + '.csv', 'wb') as f:
+            numpy.savetxt(f, numpy.column_stack((frames, data[:, i])),
+                          fmt=['%d'] + ['%.9g'] * data.shape[2], delimiter=',',
+                          header='frame,' + ','.join(TRAJECTORY_COLUMNS), comments='')
+
+def start_triangles_writer(triangles, vertex_count, frame_start, frame_count, triangles_path):
+    """Writes the triangles of the body, given as vertex indices, and an xml
+     header holding the frame range and counts. Returns a FrameWriter that
+     streams the location of every vertex in each captured frame to disk.
+    """
+    numpy.save(triangles_path + os.sep + TRIANGLES_DATA_FILE,
+               numpy.asarray(triangles, dtype=numpy.int32))
+
+    triangles_element = Element('triangles',
+                                {'triangles': TRIANGLES_DATA_FILE,
+                                 'vertices': VERTICES_DATA_FILE,
+                                 'frame_start': str(frame_start),
+                                 'frame_end': str(frame_start + frame_count - 1),
+                                 'triangle_count': str(len(triangles)),
+                                 'vertex_count': str(vertex_count)})
+    with open(triangles_path + os.sep + TRIANGLES_HEADER_FILE, 'wb') as f:
+        f.write(tostring(triangles_element))
+
+    return FrameWriter(triangles_path + os.sep + VERTICES_DATA_FILE,
+                       (frame_count, vertex_count, 3), numpy.float32)
+
+class FrameWriter:
+    """Writes an array saved as a .npy file one frame at a time, so captured
+     frames never have to be kept in memory. Frames are handed to a writer
+     thread through a bounded queue; put blocks if the writer falls behind.
+    """
+
+    def __init__(self, path, shape, dtype, max_queued_frames=16):
+        self.dtype = numpy.dtype(dtype)
+        self.frame_shape = shape[1:]
+        self.error = None
+        self._aborted = False
+        self._queue = Queue(max_queued_frames)
+        self._file = open(path, 'wb')
+        numpy.lib.format.write_array_header_1_0(self._file,
+                                                {'descr': numpy.lib.format.dtype_to_descr(self.dtype),
+                                                 'fortran_order': False,
+                                                 'shape': shape})
+        self._thread = Thread(target=self._write_frames)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, frame):
+        """Queues the next frame to be written."""
+        frame = numpy.asarray(frame, dtype=self.dtype)
+        if frame.shape != self.frame_shape:
+            raise ValueError("Expected a frame of shape " + str(self.frame_shape))
+
+        self._queue.put(frame)
+
+    def close(self):
+        """Waits for every queued frame to be written and closes the file."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Stops writing, discarding any queued frames, and deletes the
+         partially written file.
+        """
+        self._aborted = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        os.remove(self._file.name)
+
+    def _write_frames(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+
+            # Keep draining the queue after an error so put never blocks.
+            if self.error is None and not self._aborted:
+                try:
+                    self._file.write(frame.tobytes())
+                except Exception as e:
+                    self.error = e
@@ -24,7 +24,8 @@ def get_plugins(setTheAttrs):
     plugins_dict['Trajectory'] = {'file' : None,
                                   'variables' : trajectory_vars,
                                   'extras': {},
-                                  'hidden': False}
+                                  'hidden': False,
+                                  'batch': False}
     for var in trajectory_vars:
         setattr(bpy.types.Object, 'Trajectory' + var, bpy.props.BoolProperty(default=True, name=var))
         setattr(bpy.types.Object, 'GRAPH_Trajectory' + var,
@@ -39,6 +40,7 @@ def get_plugins(setTheAttrs):
         simulator_name = simulator.attrib['name']
         simulator_file = simulator.attrib['file']
         hidden = simulator.attrib['hidden']
+        batch = simulator.attrib.get('batch', "false")
         will_graph = simulator.attrib['graph']
         variables = []
         requirements_element = simulator.find("requirements") if simulator.find("requirements") else []
@@ -73,7 +75,8 @@ def get_plugins(setTheAttrs):
                                         'variables': variables,
                                         'requirements': [requirement.text for requirement in requirements_element],
                                         'extras': extras,
-                                        'hidden': hidden == "true"}
+                                        'hidden': hidden == "true",
+                                        'batch': batch == "true"}
 
     return plugins_dict, unit_map
 
@@ -1,4 +1,6 @@
 import sys, os, ast
+import numpy as np
+from xml.etree.ElementTree import ElementTree as ET
 import matplotlib
 matplotlib.use('Qt4Agg')
 
@@ -79,20 +81,29 @@ def plot_file(fps, base_dir, string_graph_map):
     # Find the length of the simulation by looking at trajectory results.
     start_frame = 1
     count = 0
-    with open(base_dir + os.sep + 'Trajectory' + os.sep + graph_map.keys()[0] + '.csv') as f:
-        iterF = iter(f)
-        # Skip header
-        next(iterF)
-        line = next(iterF)
-        start_frame = float(line.split(',')[0])
-        count = sum(1 for line in iterF)
+    trajectory_header = base_dir + os.sep + 'Trajectory' + os.sep + 'trajectory.xml'
+    if os.path.exists(trajectory_header):
+        header = ET().parse(trajectory_header)
+        start_frame = float(header.attrib['frame_start'])
+        count = int(header.attrib['frame_end']) - int(header.attrib['frame_start'])
+    else:
+        with open(base_dir + os.sep + 'Trajectory' + os.sep + graph_map.keys()[0] + '.csv') as f:
+            iterF = iter(f)
+            # Skip header
+            next(iterF)
+            line = next(iterF)
+            start_frame = float(line.split(',')[0])
+            count = sum(1 for line in iterF)
 
     frame = MainWindow(start_frame, count)
 
     for sensor in graph_map:
         layout_contents = frame.add_tab(sensor)
         for plugin in graph_map[sensor]:
-            data = get_data(base_dir + os.sep + plugin + os.sep + sensor + '.csv')
+            if plugin == 'Trajectory' and os.path.exists(trajectory_header):
+                data = get_trajectory_data(trajectory_header, sensor)
+            else:
+                data = get_data(base_dir + os.sep + plugin + os.sep + sensor + '.csv')
             for variable_group in graph_map[sensor][plugin]:
                 qfigWidget = QtGui.QWidget(layout_contents[1])
                 fig = Figure((5.0, 4.0), dpi=100)
@@ -141,5 +152,19 @@ def get_data(filename):
 
     return data
 
+def get_trajectory_data(header_path, sensor):
+    """Reads the columns of one sensor from the binary trajectory file
+     described by header_path. Laid out like get_data, i.e. the first column
+     holds the frames.
+    """
+
+    header = ET().parse(header_path)
+    sensors = [sensor_element.text for sensor_element in header.iter('sensor')]
+    values = np.load(os.path.dirname(header_path) + os.sep + header.attrib['data'],
+                     mmap_mode='r')
+    frames = np.arange(int(header.attrib['frame_start']),
+                       int(header.attrib['frame_end']) + 1)
+    return np.vstack((frames, values[:, sensors.index(sensor)].T))
+
 if __name__ == "__main__":
     plot_file(float(sys.argv[1]), sys.argv[2], sys.argv[3])
@@ -15,6 +15,9 @@ fps = 30
 # sensor. This functionality may be added if needed in the future.
 extras_values = {}
 trajectory_path = ""
+# Trajectories are always saved as one binary file per simulation; the per
+# sensor csv files are an export kept for the LOS simulator and older plugins.
+write_trajectory_csv = True
 # This will hold temporary tringle data; will be overwritten each run.
 triangles_path = os.path.expanduser('~') + os.sep + '.bodysim' + os.sep + 'triangles' + os.sep
 triangle_count = 0
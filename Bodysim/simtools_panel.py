@@ -572,14 +572,17 @@ class RunBatchOperator(bpy.types.Operator):
         # TODO Close all open sims before running, i.e. flush panels.
         # We only need to calculate the triangles in the first run.
         scene = bpy.context.scene
-        # This is not blocking!
+        # This runs the batch again once the triangles are generated: straight
+        # away when stepping through the frames, or after the last frame when
+        # recording during animation playback. Either way, stop here.
         if not Bodysim.sim_params.all_frames_recorded:
             bpy.ops.bodysim.generate_triangles_and_batch('EXEC_DEFAULT', frame_start=1, frame_end=scene.frame_end)
             return {'FINISHED'}
 
         if batch_list:
             bpy.ops.bodysim.load_simulation('EXEC_DEFAULT', simulation_name=batch_list[0])
-            # This is not blocking.
+            # The simulators may still be running when this returns; they run the
+            # next simulation in the batch once they are done.
             bpy.ops.bodysim.simulation_execute('EXEC_DEFAULT',
                                         simulation_state=Bodysim.file_operations.SimulationState.Batched)
 
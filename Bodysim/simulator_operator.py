@@ -0,0 +1,65 @@
+"""A modal operator in blender that runs the external simulators in the
+ background and polls them from a timer, so blender does not freeze while
+ they are running. The state of each simulator run is shown in the status
+ panel.
+"""
+
+import bpy
+import Bodysim.file_operations
+import Bodysim.status_panel
+
+class SimulatorOperator(bpy.types.Operator):
+    """Run the external simulators without blocking."""
+    bl_idname = "bodysim.run_simulators"
+    bl_label = "Simulator Modal Operator"
+    batched_mode = bpy.props.BoolProperty()
+    _timer = None
+    _executor = None
+    _futures = None
+    _jobs = None
+
+    def modal(self, context, event):
+
+        if event.type == 'TIMER':
+            redraw_status_panel(context)
+            if all(future.done() for future in self._futures):
+                context.window_manager.event_timer_remove(self._timer)
+                self._executor.shutdown(wait=False)
+                Bodysim.file_operations.finish_simulators(self._jobs, self.batched_mode)
+                return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
+
+    def execute(self, context):
+        self._jobs = Bodysim.file_operations.get_simulator_jobs()
+        Bodysim.status_panel.simulator_jobs = self._jobs
+
+        # There is no window to add a timer to when running in the
+        # background, so just wait for the simulators.
+        if context.window is None:
+            Bodysim.file_operations.run_simulator_jobs(self._jobs)
+            Bodysim.file_operations.finish_simulators(self._jobs, self.batched_mode)
+            return {'FINISHED'}
+
+        self._executor, self._futures = Bodysim.file_operations.start_simulator_jobs(self._jobs)
+        self._timer = context.window_manager.event_timer_add(0.5, context.window)
+        context.window_manager.modal_handler_add(self)
+        redraw_status_panel(context)
+        return {'RUNNING_MODAL'}
+
+def redraw_status_panel(context):
+    """Redraws the tool shelves so the status panel shows the latest job
+     states.
+    """
+    for area in context.screen.areas:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+def register():
+    bpy.utils.register_class(SimulatorOperator)
+
+def unregister():
+    bpy.utils.unregister_class(SimulatorOperator)
+
+if __name__ == "__main__":
+    register()
@@ -1,4 +1,5 @@
 import bpy
+import Bodysim.file_operations
 
 current_status_panel = None
 session = "NONE"
@@ -7,6 +8,8 @@ editing = True
 nameless = True
 sim_saved = False
 sim_name = "NONE"
+# External simulator runs of the last simulation; see simulator_operator.
+simulator_jobs = []
 
 class CurrentStatusPanel(bpy.types.Panel):
     """Panel that displays the sensors of a given simulation."""
@@ -73,6 +76,9 @@ def draw_status_panel():
                 text += sim_name
                 wrap(col_layout, text)
 
+        if simulator_jobs:
+            draw_simulator_jobs(self.layout)
+
     current_status_panel = type("CurrentStatusPanel", (bpy.types.Panel,),{
         "bl_label": bl_label,
         "bl_space_type": bl_space_type,
@@ -80,6 +86,23 @@ def draw_status_panel():
         "draw": _draw_status_panel},)
     bpy.utils.register_class(current_status_panel)
 
+def draw_simulator_jobs(layout):
+    """Lists the state and run time of each external simulator run."""
+    job_state = Bodysim.file_operations.JobState
+    col_layout = layout.column()
+    counts = [len([job for job in simulator_jobs if job.state == state])
+              for state in range(len(job_state.names))]
+    text = "External Simulators: "
+    text += ", ".join(str(counts[state]) + " " + job_state.names[state].lower()
+                      for state in range(len(job_state.names)) if counts[state])
+    wrap(col_layout, text)
+    for job in simulator_jobs:
+        col_layout = layout.column()
+        text = "{0}: {1}".format(job.name, job_state.names[job.state])
+        if job.state != job_state.Queued:
+            text += " ({0:.1f} s)".format(job.elapsed())
+        wrap(col_layout, text)
+
 def wrap(col,text,area="VIEW_3D",type="TOOLS",TabStr="    ",scaleY=0.55):
     """ Magical function that wraps long text in blender UI panels.
     Source: http://blenderartists.org/forum/showthread.php?243723.
@@ -7,6 +7,7 @@ import os
 import time
 import shutil
 import mathutils
+import numpy
 import Bodysim.file_operations
 import Bodysim.sim_params
 import Bodysim.plugins_info
@@ -14,6 +15,9 @@ import Bodysim.plugins_info
 class TrackSensorOperator(bpy.types.Operator):
     """Logs location and rotation of sensors along respective paths.
      Rotation in quaternions.
+     By default the frames are stepped through with scene.frame_set() as fast
+     as blender can evaluate them, which also works with blender --background.
+     Set frame_stepped to False to record during animation playback instead.
     """
 
     bl_idname = "bodysim.track_sensors"
@@ -23,38 +27,27 @@ class TrackSensorOperator(bpy.types.Operator):
     frame_end = bpy.props.IntProperty()
     path = bpy.props.StringProperty()
     calc_triangles = bpy.props.BoolProperty()
+    frame_stepped = bpy.props.BoolProperty(default=True)
     sensor_objects = None
-    trajectory_data = []
-    # Stores triangle data in every frame so we don't write to disk every frame.
-    all_triangle_data = []
+    trajectory_data = None
+    # Streams the vertex locations of each frame to disk as they are captured.
+    vertex_writer = None
     start = None
+    # The frame the scene should change to next during animation playback.
+    next_frame = None
 
 
-    def store_data(self):
-        scene = bpy.context.scene
+    def store_data(self, frame):
+        # Each row holds the world space location followed by the rotation
+        # quaternion (w, x, y, z) of one sensor.
+        poses = self.trajectory_data[frame - self.frame_start]
         for i in range(len(self.sensor_objects)):
-            # World space coordinates
-            translation_vector = self.sensor_objects[
-                i][0].matrix_world.to_translation()
-            x = translation_vector[0]
-            y = translation_vector[1]
-            z = translation_vector[2]
-
-            # Rotation
-            rotation_vector = self.sensor_objects[
-                i][0].matrix_world.to_quaternion()
-            w = rotation_vector[0]
-            rx = rotation_vector[1]
-            ry = rotation_vector[2]
-            rz = rotation_vector[3]
-
-            # Store trajectory data
-            output = "{0},{1},{2},{3},{4},{5},{6},{7}\n".format(
-                scene.frame_current - 1, x, y, z, w, rx, ry, rz)
-            self.trajectory_data[i].append(output)
+            matrix_world = self.sensor_objects[i][0].matrix_world
+            poses[i, :3] = matrix_world.to_translation()
+            poses[i, 3:] = matrix_world.to_quaternion()
 
         if self.calc_triangles:
-            self.all_triangle_data.append(get_triangles())
+            self.vertex_writer.put(get_vertices())
 
     @classmethod
     def poll(cls, context):
@@ -62,54 +55,92 @@ class TrackSensorOperator(bpy.types.Operator):
 
     def _stop(self, context):
         scene = bpy.context.scene
-        self.store_data()
+        # Any other frame means playback was cancelled, the frame was changed
+        # by hand or frames were dropped, so the capture cannot be completed.
+        if scene.frame_current != self.next_frame:
+            self._abort()
+            return {'CANCELLED'}
+
+        self.next_frame += 1
+        # The scene has not been updated to the new frame yet, so the objects
+        # are still at the previous one.
+        try:
+            self.store_data(scene.frame_current - 1)
+        except:
+            self._abort()
+            raise
+
         if scene.frame_current == self.frame_end + 1:
             bpy.ops.screen.animation_cancel(restore_frame=True)
             bpy.app.handlers.frame_change_pre.remove(self._stop)
+            self._finish()
+            return {'FINISHED'}
 
-            if self.calc_triangles:
-                # Write triangle data to files.
-                for i in range(len(self.all_triangle_data)):
-                    with open(Bodysim.sim_params.triangles_path + os.sep + 'frame' + str(self.frame_start + i) + '.csv', 'w') as f:
-                        for triangle in self.all_triangle_data[i]:
-                            f.write(",".join([str(dim) for point in triangle for dim in point]) + '\n')
+        return {'PASS_THROUGH'}
 
-            # Write trajectory and wireless channel data.
-            Bodysim.file_operations.write_results(self.trajectory_data,
-                                                  self.sensor_objects,
-                                                  self.path + os.sep + 'Trajectory')
+    def _abort(self):
+        """Stops recording and discards the vertex locations written so far."""
+        stop_playback(self._stop)
+        if self.vertex_writer is not None:
+            self.vertex_writer.abort()
 
-            elapsed = (time.clock() - self.start)
-            print ('trajTime ' + str(elapsed))
+    def _finish(self):
+        """Writes out the recorded data and runs the external simulators."""
+        if self.calc_triangles:
+            # Finish writing triangle data to file.
+            self.vertex_writer.close()
 
+        # Write trajectory and wireless channel data.
+        Bodysim.file_operations.write_results(self.trajectory_data,
+                                              self.sensor_objects,
+                                              self.path + os.sep + 'Trajectory',
+                                              self.frame_start)
 
-            # Run the external simulators once all results have been written.
-            Bodysim.file_operations.execute_simulators(scene.objects['model']['current_simulation_path'], not self.calc_triangles)
-            return {'FINISHED'}
+        elapsed = (time.clock() - self.start)
+        print ('trajTime ' + str(elapsed))
 
-        return {'PASS_THROUGH'}
+        # Run the external simulators once all results have been written.
+        # The simulators may still be running when this returns; they continue
+        # the batch themselves once they are done.
+        bpy.ops.bodysim.run_simulators('EXEC_DEFAULT', batched_mode=not self.calc_triangles)
 
     def execute(self, context):
         self.start = time.clock()
         self.sensor_objects = Bodysim.plugins_info.populate_sensor_list()
-        self.trajectory_data = []
-        for i in range(len(self.sensor_objects)):
-            self.trajectory_data.append([])
-            self.trajectory_data[i].append("frame,x,y,z,w,rx,ry,rz\n")
+        # trajectory_data[frame][sensor] = (x, y, z, w, rx, ry, rz)
+        self.trajectory_data = numpy.zeros((self.frame_end - self.frame_start + 1,
+                                            len(self.sensor_objects), 7))
 
         # Remove all existing triangle data in triangles_path
         if self.calc_triangles:
             # In blender, the z - "dimension" is strangely at index 1, not 2;
             # The matrix world z is at index 2...
             Bodysim.sim_params.height = max(bpy.data.objects["model"].dimensions)
-            Bodysim.sim_params.triangle_count = len(get_triangles())
+            triangles, vertex_count = get_triangles()
+            Bodysim.sim_params.triangle_count = len(triangles)
             if os.path.exists(Bodysim.sim_params.triangles_path):
                 shutil.rmtree(Bodysim.sim_params.triangles_path)
 
             os.mkdir(Bodysim.sim_params.triangles_path)
+            self.vertex_writer = Bodysim.file_operations.start_triangles_writer(
+                triangles, vertex_count, self.frame_start,
+                self.frame_end - self.frame_start + 1, Bodysim.sim_params.triangles_path)
+
+        if self.frame_stepped:
+            try:
+                fps = step_frames(self.frame_start, self.frame_end, self.store_data)
+            except:
+                self._abort()
+                raise
+
+            self.report({'INFO'}, "Captured {0} frames at {1:.1f} frames/s.".format(
+                self.frame_end - self.frame_start + 1, fps))
+            self._finish()
+            return {'FINISHED'}
 
         # Blender can only stop the animation via a frame event handler...
         bpy.context.scene.frame_set(self.frame_start)
+        self.next_frame = self.frame_start + 1
         bpy.app.handlers.frame_change_pre.append(self._stop)
         bpy.ops.screen.animation_play()
 
@@ -123,61 +154,126 @@ class GenerateAllTrianglesOperator(bpy.types.Operator):
 
     frame_start = bpy.props.IntProperty()
     frame_end = bpy.props.IntProperty()
-    # Stores triangle data in every frame so we don't write to disk every frame.
-    all_triangle_data = []
+    frame_stepped = bpy.props.BoolProperty(default=True)
+    # Streams the vertex locations of each frame to disk as they are captured.
+    vertex_writer = None
+    # The frame the scene should change to next during animation playback.
+    next_frame = None
 
     @classmethod
     def poll(cls, context):
         return True
 
+    def store_data(self, frame):
+        self.vertex_writer.put(get_vertices())
+
     def _stop(self, context):
         scene = bpy.context.scene
-
-        self.all_triangle_data.append(get_triangles())
+        # Any other frame means playback was cancelled, the frame was changed
+        # by hand or frames were dropped, so the capture cannot be completed.
+        if scene.frame_current != self.next_frame:
+            self._abort()
+            return {'CANCELLED'}
+
+        self.next_frame += 1
+        try:
+            self.store_data(scene.frame_current - 1)
+        except:
+            self._abort()
+            raise
 
         if scene.frame_current == self.frame_end + 1:
             bpy.ops.screen.animation_cancel(restore_frame=True)
             bpy.app.handlers.frame_change_pre.remove(self._stop)
-
-            # Write triangle data to files.
-            for i in range(len(self.all_triangle_data)):
-                with open(Bodysim.sim_params.triangles_path + os.sep + 'frame' + str(self.frame_start + i) + '.csv', 'w') as f:
-                    for triangle in self.all_triangle_data[i]:
-                        f.write(",".join([str(dim) for point in triangle for dim in point]) + '\n')
-
-            # Go back to running the batch
-            Bodysim.sim_params.all_frames_recorded = True
-            bpy.ops.bodysim.run_batch('EXEC_DEFAULT')
+            self._finish()
             return {'FINISHED'}
 
         return {'PASS_THROUGH'}
 
+    def _abort(self):
+        """Stops recording and discards the vertex locations written so far."""
+        stop_playback(self._stop)
+        self.vertex_writer.abort()
+
+    def _finish(self):
+        """Finishes writing the triangles and goes back to running the batch."""
+        self.vertex_writer.close()
+
+        # Go back to running the batch
+        Bodysim.sim_params.all_frames_recorded = True
+        bpy.ops.bodysim.run_batch('EXEC_DEFAULT')
+
     def execute(self, context):
         # In blender, the z - "dimension" is strangely at index 1, not 2;
         # The matrix world z is at index 2...
         Bodysim.sim_params.height = max(bpy.data.objects["model"].dimensions)
-        Bodysim.sim_params.triangle_count = len(get_triangles())
+        triangles, vertex_count = get_triangles()
+        Bodysim.sim_params.triangle_count = len(triangles)
 
         # Remove all existing triangle data in triangles_path
         if os.path.exists(Bodysim.sim_params.triangles_path):
             shutil.rmtree(Bodysim.sim_params.triangles_path)
 
         os.mkdir(Bodysim.sim_params.triangles_path)
+        self.vertex_writer = Bodysim.file_operations.start_triangles_writer(
+            triangles, vertex_count, self.frame_start,
+            self.frame_end - self.frame_start + 1, Bodysim.sim_params.triangles_path)
+
+        if self.frame_stepped:
+            try:
+                fps = step_frames(self.frame_start, self.frame_end, self.store_data)
+            except:
+                self._abort()
+                raise
+
+            self.report({'INFO'}, "Generated triangles for {0} frames at {1:.1f} frames/s.".format(
+                self.frame_end - self.frame_start + 1, fps))
+            self._finish()
+            return {'FINISHED'}
 
         # Blender can only stop the animation via a frame event handler...
         bpy.context.scene.frame_set(self.frame_start)
+        self.next_frame = self.frame_start + 1
         bpy.app.handlers.frame_change_pre.append(self._stop)
         bpy.ops.screen.animation_play()
 
         return {'RUNNING_MODAL'}
 
-def get_triangles():
-    """Converts all vertex groups of the model into triangles if necessary.
-       This is needed because some vertex groups have four vertices.
+def step_frames(frame_start, frame_end, store_frame):
+    """Evaluates every frame from frame_start to frame_end (inclusive) as fast
+     as blender can, calling store_frame with the frame number once the scene
+     has been updated to that frame. Does not need an interactive window, so
+     this also works from blender --background.
+     Returns the number of frames evaluated per second.
     """
-    ob = bpy.data.objects["model"]
+    scene = bpy.context.scene
+    original_frame = scene.frame_current
+    frame_count = frame_end - frame_start + 1
+    start = time.clock()
+    for frame in range(frame_start, frame_end + 1):
+        scene.frame_set(frame)
+        store_frame(frame)
+
+    elapsed = time.clock() - start
+    scene.frame_set(original_frame)
+    return frame_count / elapsed if elapsed > 0 else float('inf')
+
+def stop_playback(frame_handler):
+    """Stops recording during animation playback: removes frame_handler and
+     cancels the animation if it is still playing.
+    """
+    if frame_handler in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(frame_handler)
 
-    triangles = []
+    screen = bpy.context.screen
+    if screen is not None and screen.is_animation_playing:
+        bpy.ops.screen.animation_cancel(restore_frame=True)
+
+def get_model_mesh():
+    """Returns a mesh of the model for the current frame in world space.
+     The caller must remove it from bpy.data.meshes once done.
+    """
+    ob = bpy.data.objects["model"]
 
     # http://blender.stackexchange.com/questions/3462/vertex-coordinate-after-pose-change
     # Need to apply modifiers to the object, creating a mesh that will store
@@ -185,33 +281,68 @@ def get_triangles():
     modified_mesh = ob.to_mesh(scene=bpy.context.scene, apply_modifiers=True,
                                settings='PREVIEW')
     modified_mesh.transform(ob.matrix_world)
+    return modified_mesh
 
-    for polygon in modified_mesh.polygons:
-        polygon_vertex_list = [modified_mesh.vertices[vert_index].co
-                               for vert_index in polygon.vertices]
-        triangles.append([polygon_vertex_list[i] for i in range(3)])
-
-        if len(polygon_vertex_list) > 3:
-            dist_a_b = (polygon_vertex_list[0] - polygon_vertex_list[1]).length
-            dist_a_c = (polygon_vertex_list[0] - polygon_vertex_list[2]).length
-            dist_a_d = (polygon_vertex_list[0] - polygon_vertex_list[3]).length
-            other_half = [polygon_vertex_list[3]]
-            max_dist = max(dist_a_b, dist_a_c, dist_a_d)
-
-            if max_dist == dist_a_b:
-                other_half.extend([polygon_vertex_list[0], polygon_vertex_list[1]])
-
-            elif max_dist == dist_a_c:
-                other_half.extend([polygon_vertex_list[0], polygon_vertex_list[2]])
-
-            elif max_dist == dist_a_d:
-                other_half.extend([polygon_vertex_list[1], polygon_vertex_list[2]])
-
-            else:
-                bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Error",
-                                        message = 'LOS determination failed.')
-                raise Exception("Something went wrong with Max function.")
-
-            triangles.append(other_half)
-
-    return triangles
+def get_triangles():
+    """Converts all vertex groups of the model into triangles if necessary.
+       This is needed because some vertex groups have four vertices.
+       Returns the vertex indices of each triangle and the number of vertices
+       of the mesh they index. The topology of the model does not change
+       during an animation, so this only needs to be done once per model;
+       quads are split using the vertex locations of the current frame.
+    """
+    modified_mesh = get_model_mesh()
+
+    # Pull the polygons out of the mesh in bulk rather than one at a time.
+    vertices = get_mesh_vertices(modified_mesh)
+    polygon_count = len(modified_mesh.polygons)
+    loop_starts = numpy.empty(polygon_count, dtype=numpy.int32)
+    loop_totals = numpy.empty(polygon_count, dtype=numpy.int32)
+    loop_vertices = numpy.empty(len(modified_mesh.loops), dtype=numpy.int32)
+    modified_mesh.polygons.foreach_get('loop_start', loop_starts)
+    modified_mesh.polygons.foreach_get('loop_total', loop_totals)
+    modified_mesh.loops.foreach_get('vertex_index', loop_vertices)
+    bpy.data.meshes.remove(modified_mesh)
+
+    # The first three vertices of every polygon make up one triangle.
+    is_quad = loop_totals > 3
+    quad_count = numpy.count_nonzero(is_quad)
+    # Triangles of a quad are stored next to each other.
+    first_half = numpy.arange(polygon_count) + numpy.cumsum(is_quad) - is_quad
+    triangles = numpy.empty((polygon_count + quad_count, 3), dtype=numpy.int32)
+    triangles[first_half] = loop_vertices[loop_starts[:, None] + numpy.arange(3)]
+
+    # The other half of a quad uses its fourth vertex and the two vertices at
+    # either end of the longest edge from its first vertex.
+    quads = loop_vertices[loop_starts[is_quad, None] + numpy.arange(4)]
+    distances = numpy.linalg.norm(vertices[quads[:, 1:]] - vertices[quads[:, :1]], axis=2)
+    if numpy.isnan(distances).any():
+        bpy.ops.bodysim.message('INVOKE_DEFAULT', msg_type = "Error",
+                                message = 'LOS determination failed.')
+        raise Exception("Something went wrong with Max function.")
+
+    # Indexed by the longest edge: a-b, a-c, a-d.
+    other_half_corners = numpy.array([[3, 0, 1], [3, 0, 2], [3, 1, 2]])
+    longest_edge = numpy.argmax(distances, axis=1)
+    triangles[first_half[is_quad] + 1] = quads[numpy.arange(quad_count)[:, None],
+                                               other_half_corners[longest_edge]]
+
+    return triangles, len(vertices)
+
+def get_vertices():
+    """Returns the world space location of every vertex of the model for the
+     current frame. Together with get_triangles, this gives the location of
+     every triangle.
+    """
+    modified_mesh = get_model_mesh()
+    vertices = get_mesh_vertices(modified_mesh)
+    bpy.data.meshes.remove(modified_mesh)
+    return vertices
+
+def get_mesh_vertices(mesh):
+    """Returns the location of every vertex of the mesh as a float32 array,
+     read in a single call.
+    """
+    vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get('co', vertices)
+    return vertices.reshape(-1, 3)
@@ -1,3 +1,4 @@
+from trajectory_reader import read_trajectory
 import numpy as np
 import os
 import sys
@@ -30,8 +31,7 @@ def read_inputs(filename, fps):
 	'''
 	Produce trajectory from sensor position and orientation data
 	'''
-	f = open(filename, 'r').read().strip().split('\n')
-	values = np.array([[float(a) for a in k.split(',')] for k in f]).transpose()
+	values = read_trajectory(filename)
 
 	# extract relevant data
 	frames = values[0] # frames
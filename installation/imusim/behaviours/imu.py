@@ -18,6 +18,7 @@ Behaviours for IMU devices.
 # You should have received a copy of the GNU General Public License
 # along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
 from abc import ABCMeta
+import numpy as np
 from imusim.utilities.time_series import TimeSeries
 from imusim.behaviours.timing import TimerMultiplexer, VirtualTimer
 from imusim.behaviours.sampling import PeriodicSampler
@@ -25,6 +26,8 @@ from imusim.algorithms.calibration import SensorCalibration
 from imusim.platforms.sensors import Sensor
 from imusim.algorithms.orientation import OrientationFilter
 from imusim.platforms.imus import IMU
+from imusim.platforms.adcs import IdealADC, QuantisingADC, ParametricADC
+from imusim.platforms.timers import IdealTimer
 
 class BasicIMUBehaviour(object):
     """
@@ -88,3 +91,57 @@ class BasicIMUBehaviour(object):
             self.filter(*measurements + [self._time])
         if self.sampleCallback != None:
             self.sampleCallback(self)
+
+def canSampleIMU(imu):
+    """
+    Check whether an IMU can be sampled by L{sampleIMU}.
+
+    @param imu: L{IMU} to check.
+    @return: True if the IMU has an L{IdealTimer} and an ADC that samples
+        all sensors instantaneously, False otherwise.
+    """
+    return isinstance(imu.timer, IdealTimer) \
+        and isinstance(imu.adc, (IdealADC, QuantisingADC)) \
+        and not isinstance(imu.adc, ParametricADC)
+
+def sampleIMU(imu, samplingPeriod, endTime, initialTime=0):
+    """
+    Sample the sensors of an IMU at a fixed period in a single vectorised step.
+
+    This produces the same raw measurements as attaching a
+    L{BasicIMUBehaviour} without calibration, filter or sample callback to
+    the IMU and running its simulation to endTime. Instead of scheduling a
+    simulation event for every sample, each sensor is evaluated once on the
+    array of all sample times and the ADC transfer function is applied to
+    the whole array.
+
+    The IMU must have an L{IdealTimer}, and an ADC that samples all sensors
+    instantaneously. The simulation itself is not advanced.
+
+    @param imu: L{IMU} to sample. The time of its simulation must be set.
+    @param samplingPeriod: Interval at which to sample (float).
+    @param endTime: Simulation time up to which to sample (float).
+    @param initialTime: Initial time for local timekeeping.
+    """
+    if not canSampleIMU(imu):
+        raise ValueError, "Vectorised sampling requires an ideal timer " \
+            "and an ADC without sampling delays"
+
+    # Reproduce the event driven simulation exactly. Its engine clock starts
+    # at zero and adds the period one step at a time, with the start time
+    # added on afterwards, and its timestamps add the period to the initial
+    # time one step at a time. np.cumsum adds sequentially in the same order.
+    startTime = imu.simulation.time
+    count = int((endTime - startTime) / samplingPeriod) + 2
+    elapsed = np.cumsum(np.repeat(samplingPeriod, count))
+    elapsed = elapsed[elapsed <= endTime - startTime]
+    t = startTime + elapsed
+    timestamps = np.cumsum(np.r_[initialTime,
+        np.repeat(samplingPeriod, len(t))])[1:]
+
+    for sensor in imu.sensors:
+        if len(t) == 0:
+            sensor.rawMeasurements = TimeSeries()
+        else:
+            sensor.rawMeasurements = TimeSeries(timestamps,
+                imu.adc.transferFunction(sensor.voltages(t)))
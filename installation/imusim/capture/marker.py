@@ -94,10 +94,20 @@ class SplinedMarkerCapture(MarkerCapture):
 
     @param sampled: L{MarkerCapture} with sampled marker data.
     @param kwargs: Keyword arguments to pass to spline trajectory constructors.
+        If a L{SplineFitter} is given as splineFitter, the splines of all
+        markers are submitted to it together.
     """
     def __init__(self, sampled, **kwargs):
         self.sampled = sampled
         self._markers = dict()
+        fitter = kwargs.get('splineFitter')
+        if fitter is not None:
+            for marker in sampled.markers:
+                fitter.submit(*SplinedMarker3DOF._positionSplineFit(marker,
+                    **kwargs))
+                if isinstance(marker, Marker6DOF):
+                    fitter.submit(*SplinedMarker6DOF._rotationSplineFit(
+                        marker, **kwargs))
         for marker in sampled.markers:
             if isinstance(marker, Marker6DOF):
                 markerClass = SplinedMarker6DOF
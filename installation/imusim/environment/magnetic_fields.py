@@ -178,33 +178,47 @@ class SolenoidMagneticField(object):
 
         return Br,Bz
 
-@np.vectorize
 def _cel(kc,p,c,s):
     """
     Algorithm for the generalised complete elliptic integral C(k_c,p,c,s).
+
+    Arguments are broadcast against each other, and the iteration is carried
+    out for all elements together, each element being updated until it has
+    converged.
     """
 
     ERRTOL = 1e-6
 
-    if kc == 0: return np.nan
+    kc, p, c, s = np.broadcast_arrays(*[np.asarray(x, dtype=float)
+        for x in (kc, p, c, s)])
+    shape = kc.shape
+    kc, p, c, s = [x.ravel() for x in (kc, p, c, s)]
 
     k = np.abs(kc)
-    pp = p
-    cc = c
-    ss = s
-    em = 1
-    if p > 0:
-        pp = np.sqrt(p)
-        ss = s/pp
-    else:
-        f = kc**2
+    positive = p > 0
+    negative = ~positive
+    pp = p.copy()
+    cc = c.copy()
+    ss = s.copy()
+    em = np.ones_like(k)
+
+    pp[positive] = np.sqrt(p[positive])
+    ss[positive] = s[positive]/pp[positive]
+
+    if np.any(negative):
+        pn = p[negative]
+        cn = c[negative]
+        sn = s[negative]
+        f = kc[negative]**2
         q = 1-f
-        g = 1-pp
-        f = f-pp
-        q = q*(ss-c*pp)
-        pp = np.sqrt(f/g)
-        cc = (c-ss)/g
-        ss = -q/(g**2 * pp) + cc*pp
+        g = 1-pn
+        f = f-pn
+        q = q*(sn-cn*pn)
+        pn = np.sqrt(f/g)
+        cn = (cn-sn)/g
+        pp[negative] = pn
+        cc[negative] = cn
+        ss[negative] = -q/(g**2 * pn) + cn*pn
 
     f = cc
     cc = cc + ss/pp
@@ -213,17 +227,22 @@ def _cel(kc,p,c,s):
     pp = g+pp
     g = em
     em = k+em
-    kk = k
-
-    while np.abs(g-k) > g*ERRTOL:
-        k = 2*np.sqrt(kk)
-        kk = k*em
-        f = cc
-        cc = cc + ss/pp
-        g = kk/pp
-        ss = 2*(ss + f*g)
-        pp = g+pp
-        g = em
-        em = k+em
-
-    return (np.pi/2)*(ss+cc*em)/(em*(em+pp))
+    kk = k.copy()
+
+    active = (np.abs(g-k) > g*ERRTOL) & (kc != 0)
+    while np.any(active):
+        k[active] = 2*np.sqrt(kk[active])
+        kk[active] = k[active]*em[active]
+        f = cc[active]
+        cc[active] = cc[active] + ss[active]/pp[active]
+        g[active] = kk[active]/pp[active]
+        ss[active] = 2*(ss[active] + f*g[active])
+        pp[active] = g[active]+pp[active]
+        g[active] = em[active]
+        em[active] = k[active]+em[active]
+        active[active] = np.abs(g[active]-k[active]) > g[active]*ERRTOL
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (np.pi/2)*(ss+cc*em)/(em*(em+pp))
+    result[kc == 0] = np.nan
+    return result.reshape(shape)
@@ -0,0 +1,111 @@
+"""
+Counter based random number generation.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+
+class CounterRNG(object):
+    """
+    Generator of random numbers as a function of a key and a counter.
+
+    Each value in a stream depends only on the key of the generator and on
+    the position, or counter, of the value in the stream. Any block of
+    values can therefore be generated independently, in any order and in
+    any process, with the same result.
+
+    Values are produced by the SplitMix64 generator of G. L. Steele, D. Lea
+    and C. H. Flood, "Fast Splittable Pseudorandom Number Generators", in
+    Proc. OOPSLA 2014, pp 453-472, ACM, 2014, which scrambles the counter
+    offset by the key with a fixed mixing function.
+
+    @ivar key: Key selecting the stream of values (int).
+    """
+
+    _GAMMA = np.uint64(0x9e3779b97f4a7c15)
+    _MULTIPLIERS = (np.uint64(0xbf58476d1ce4e5b9),
+            np.uint64(0x94d049bb133111eb))
+    _SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31))
+
+    def __init__(self, key=None):
+        """
+        Initialise generator.
+
+        @param key: Key selecting the stream of values (int). If None, a key
+            is drawn from the global L{np.random} generator.
+        """
+        if key is None:
+            key = np.random.randint(2**31)
+        self.key = int(key)
+        self._offset = self._mix(np.array([self.key % 2**64], dtype=np.uint64))
+
+    @classmethod
+    def _mix(cls, x):
+        """
+        Scramble an array of 64-bit unsigned integers.
+        """
+        x = (x ^ (x >> cls._SHIFTS[0])) * cls._MULTIPLIERS[0]
+        x = (x ^ (x >> cls._SHIFTS[1])) * cls._MULTIPLIERS[1]
+        return x ^ (x >> cls._SHIFTS[2])
+
+    def integers(self, counters):
+        """
+        Generate 64-bit random integers.
+
+        @param counters: Non-negative integer positions in the stream of the
+            values to generate. May be a scalar or array of any shape.
+        @return: L{np.ndarray} of uint64 values with the shape of counters.
+        """
+        # Work on one dimensional arrays, as arithmetic on NumPy scalars
+        # warns about the intended overflow.
+        counters = np.asarray(counters, dtype=np.uint64)
+        flat = counters.reshape(-1)
+        state = self._offset + (flat + np.uint64(1)) * self._GAMMA
+        return self._mix(state).reshape(counters.shape)
+
+    def uniform(self, counters):
+        """
+        Generate uniformly distributed random numbers in the interval (0,1).
+
+        @param counters: Non-negative integer positions in the stream of the
+            values to generate. May be a scalar or array of any shape.
+        @return: L{np.ndarray} of values with the shape of counters.
+        """
+        # The top 53 bits give every double in the interval with equal
+        # spacing, and the half step offset excludes zero.
+        bits = self.integers(counters) >> np.uint64(11)
+        return (bits.astype(np.float64) + 0.5) / 2**53
+
+    def normal(self, counters, loc=0, scale=1):
+        """
+        Generate normally distributed random numbers.
+
+        Each value is obtained with the Box-Muller transform from the two
+        uniform values at twice its counter and the following position.
+
+        @param counters: Non-negative integer positions in the stream of the
+            values to generate. May be a scalar or array of any shape.
+        @param loc: Mean of the distribution.
+        @param scale: Standard deviation of the distribution.
+        @return: L{np.ndarray} of values with the shape of counters.
+        """
+        counters = np.uint64(2) * np.asarray(counters, dtype=np.uint64)
+        radius = np.sqrt(-2 * np.log(self.uniform(counters)))
+        angle = 2 * np.pi * self.uniform(counters + np.uint64(1))
+        return loc + scale * radius * np.cos(angle)
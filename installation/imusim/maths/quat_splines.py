@@ -1,7 +1,179 @@
-def __bootstrap__():
-   global __bootstrap__, __loader__, __file__
-   import sys, pkg_resources, imp
-   __file__ = pkg_resources.resource_filename(__name__,'quat_splines.pyd')
-   __loader__ = None; del __bootstrap__, __loader__
-   imp.load_dynamic(__name__,__file__)
-__bootstrap__()
+"""
+Spline fitting of quaternion data.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+from itertools import izip
+from imusim.maths.splines import Spline, PartialInputSpline
+from imusim.maths.quaternions import QuaternionArray
+from imusim.maths import vectors
+
+class QuaternionBSpline(Spline):
+    """
+    Model of a quaternion function of time using B-spline fitting of keyframes.
+
+    Quaternion interpolation is performed using the algorithm from "A general
+    Construction Scheme for Unit Quaternion Curves with Simple High Order
+    Derivatives" by Kim, M.-J., Kim M.-S., and Shin, S. Y.
+
+    Each segment of the curve is the first keyframe of the segment multiplied
+    by the exponentials of the following three keyframe differences, weighted
+    by the cumulative cubic B-spline basis functions. All segments needed for
+    a set of query times are evaluated together.
+    """
+
+    def __init__(self, timestamps, quaternions):
+        """
+        Construct quaternion B-spline.
+
+        @param timestamps: Sequence of monotonically increasing keyframe times.
+        @param quaternions: L{QuaternionArray} of keyframe quaternions.
+        """
+        if len(timestamps) < 4:
+            raise Spline.InsufficientPointsError, \
+                "%d points insufficient for quaternion B-spline" \
+                    % len(timestamps)
+
+        self._timestamps = np.asarray(timestamps, dtype=float)
+        self._dts = np.diff(self._timestamps)
+        self._quaternions = QuaternionArray(quaternions)
+        # Vector parts of log(q[i-1].conjugate * q[i]); the first row is
+        # unused and left as zero.
+        self._omegas = np.zeros((len(self._timestamps), 3))
+        self._omegas[1:] = (self._quaternions[:-1].conjugate
+                * self._quaternions[1:]).log().vector.T
+
+    @property
+    def validFrom(self):
+        return self._timestamps[1]
+
+    @property
+    def validTo(self):
+        return self._timestamps[-2]
+
+    @staticmethod
+    def B(u):
+        """
+        Cumulative cubic B-spline basis functions at normalised times u.
+
+        @return: 3xN array of the 1st, 2nd and 3rd basis function values.
+        """
+        u2 = u*u
+        u3 = u2*u
+        return np.array((
+            5 + 3*u - 3*u2 + u3,
+            1 + 3*u + 3*u2 - 2*u3,
+            u3)) / 6
+
+    @staticmethod
+    def Bprime(u):
+        """
+        First and second derivatives of the cumulative basis functions with
+        respect to normalised time u.
+
+        @return: Tuple of two 3xN arrays.
+        """
+        u2 = u*u
+        return (np.array((
+                    3 - 6*u + 3*u2,
+                    3 + 6*u - 6*u2,
+                    3*u2)) / 6,
+                np.array((
+                    u - 1,
+                    1 - 2*u,
+                    u)))
+
+    def evaluate(self, t):
+        """
+        Evaluate the spline at an array of times.
+
+        @param t: Length N array of times.
+        @return: Length N L{QuaternionArray} of rotations, and 3xN arrays of
+            rotational rate and rotational acceleration vectors in the
+            rotating frame.
+        """
+        index = np.searchsorted(self._timestamps, t, side='right') - 1
+        index = np.clip(index, 1, len(self._timestamps) - 3)
+        dt = self._dts[index]
+        u = (t - self._timestamps[index]) / dt
+
+        B = self.B(u)
+        dB, ddB = self.Bprime(u)
+        dB /= dt
+        ddB /= dt**2
+
+        q = self._quaternions[index - 1]
+        omega = np.zeros((3, len(t)))
+        alpha = np.zeros((3, len(t)))
+        for j in range(3):
+            w = self._omegas[index + j].T
+            E = QuaternionArray(np.vstack((np.zeros(len(t)), w * B[j])).T,
+                    copy=False).exp()
+            D = w * dB[j]
+            # With q_j = q_{j-1} * E_j and dE_j/dt = E_j * D_j, the rate in
+            # the rotating frame is omega_j = E_j.conjugate * omega_{j-1} *
+            # E_j + 2 * D_j, and differentiating gives alpha_j.
+            q = q * E
+            omega = E.rotateFrame(omega)
+            alpha = E.rotateFrame(alpha) + 2 * vectors.cross(omega, D) \
+                    + 2 * w * ddB[j]
+            omega += 2 * D
+
+        return q, omega, alpha
+
+    def __call__(self, t):
+        """
+        Evaluate 0th, 1st and 2nd derivatives of the spline at times t.
+
+        @return: Rotation (L{Quaternion} or L{QuaternionArray}), and 3xN
+            arrays of rotational rate and rotational acceleration column
+            vectors.
+        """
+        q, omega, alpha = self.evaluate(np.atleast_1d(t).astype(float))
+        if np.ndim(t) == 0:
+            return q[0], omega, alpha
+        else:
+            return q, omega, alpha
+
+class PartialInputQuaternionBSpline(PartialInputSpline):
+    """
+    Quaternion B-spline allowing for undefined regions in output domain.
+
+    Call the resulting object returns a tuple of a QuaternionArray,
+    rotational rate array and rotational acceleration array.
+    """
+    _splineClass = QuaternionBSpline
+
+    def _validity(self, y):
+        return y.validity()
+
+    def _output(self, x, conditions, results, undefined):
+        length = len(np.atleast_1d(x))
+        q = QuaternionArray.nan(length)
+        omega = vectors.nan(length)
+        alpha = vectors.nan(length)
+        for condition, result in izip(conditions, results):
+            q.array[condition] = result[0].array
+            omega[:,condition] = result[1]
+            alpha[:,condition] = result[2]
+        if np.ndim(x) == 0:
+            return q[0], omega, alpha
+        else:
+            return q, omega, alpha
@@ -1,7 +1,854 @@
-def __bootstrap__():
-   global __bootstrap__, __loader__, __file__
-   import sys, pkg_resources, imp
-   __file__ = pkg_resources.resource_filename(__name__,'quaternions.pyd')
-   __loader__ = None; del __bootstrap__, __loader__
-   imp.load_dynamic(__name__,__file__)
-__bootstrap__()
+"""
+Quaternion maths.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+import math
+import numbers
+from imusim.maths.matrices import matrixToEuler
+from imusim.maths import vectors
+
+_AXES = dict(x=1, y=2, z=3)
+
+def _multiply(p, q):
+    """
+    Multiply arrays of quaternion components, broadcasting over all but the
+    last axis.
+    """
+    pw, px, py, pz = np.rollaxis(np.asarray(p), -1)
+    qw, qx, qy, qz = np.rollaxis(np.asarray(q), -1)
+    result = np.empty(np.broadcast(p, q).shape)
+    result[...,0] = pw*qw - px*qx - py*qy - pz*qz
+    result[...,1] = pw*qx + px*qw + py*qz - pz*qy
+    result[...,2] = pw*qy - px*qz + py*qw + pz*qx
+    result[...,3] = pw*qz + px*qy - py*qx + pz*qw
+    return result
+
+def _log(a):
+    """
+    Natural logarithm of an Nx4 array of quaternion components.
+    """
+    vnorm = np.sqrt(np.sum(a[:,1:]**2, axis=1))
+    magnitude = np.sqrt(a[:,0]**2 + vnorm**2)
+    scale = np.arctan2(vnorm, a[:,0]) / np.where(vnorm == 0, 1, vnorm)
+    result = np.empty_like(a)
+    result[:,0] = np.log(magnitude)
+    result[:,1:] = a[:,1:] * scale[:,np.newaxis]
+    return result
+
+def _exp(a):
+    """
+    Exponential of an Nx4 array of quaternion components.
+    """
+    vnorm = np.sqrt(np.sum(a[:,1:]**2, axis=1))
+    e = np.exp(a[:,0])
+    scale = e * np.where(vnorm == 0, 1, np.sin(vnorm) / np.where(vnorm == 0,
+        1, vnorm))
+    result = np.empty_like(a)
+    result[:,0] = e * np.cos(vnorm)
+    result[:,1:] = a[:,1:] * scale[:,np.newaxis]
+    return result
+
+def _rotate(a, v, sign):
+    """
+    Rotate column vectors by an Nx4 array of quaternion components.
+
+    Computes M{q*v*q.conjugate} for sign=1, or M{q.conjugate*v*q} for
+    sign=-1, without forming the intermediate quaternion products.
+    """
+    v = np.asarray(v)
+    w = a[:,0]
+    x, y, z = a[:,1], a[:,2], a[:,3]
+    vx, vy, vz = v[0], v[1], v[2]
+    uu = x*x + y*y + z*z
+    uv2 = 2 * (x*vx + y*vy + z*vz)
+    ww = w*w - uu
+    w2 = 2 * sign * w
+    result = np.empty(np.broadcast(v, a[:,:3].T).shape)
+    result[0] = ww*vx + uv2*x + w2*(y*vz - z*vy)
+    result[1] = ww*vy + uv2*y + w2*(z*vx - x*vz)
+    result[2] = ww*vz + uv2*z + w2*(x*vy - y*vx)
+    return result
+
+def _components(q):
+    """
+    Obtain the components of a L{Quaternion} or L{QuaternionArray}.
+    """
+    if isinstance(q, Quaternion):
+        return q.components
+    elif isinstance(q, QuaternionArray):
+        return q.array
+    else:
+        raise TypeError("Expected Quaternion or QuaternionArray, got %r"
+                % type(q))
+
+class Quaternion(object):
+    """
+    A quaternion value.
+
+    Math operators are overridden to support quaternion math operations.
+    """
+    __slots__ = ('w', 'x', 'y', 'z')
+
+    # Prevent numpy from treating quaternions as array elements, so that
+    # numpy scalars defer to the operators defined here.
+    __array_ufunc__ = None
+
+    def __init__(self, w=1, x=0, y=0, z=0):
+        """
+        Construct quaternion from components.
+        """
+        self.w = float(w)
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+
+    @property
+    def components(self):
+        """
+        Array of the w,x,y,z components of this quaternion.
+        """
+        return np.array((self.w, self.x, self.y, self.z))
+
+    @property
+    def vector(self):
+        """
+        The (imaginary) column vector component of this quaternion.
+        """
+        return np.array(((self.x,),(self.y,),(self.z,)))
+
+    @property
+    def conjugate(self):
+        """
+        The conjugate of this quaternion.
+        """
+        return Quaternion(self.w, -self.x, -self.y, -self.z)
+
+    @property
+    def magnitude(self):
+        """
+        The magnitude of this quaternion.
+        """
+        return math.sqrt(self.w**2 + self.x**2 + self.y**2 + self.z**2)
+
+    def __add__(self, other):
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return Quaternion(self.w + other.w, self.x + other.x,
+                self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return Quaternion(self.w - other.w, self.x - other.x,
+                self.y - other.y, self.z - other.z)
+
+    def __iadd__(self, other):
+        self.w += other.w
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def __isub__(self, other):
+        self.w -= other.w
+        self.x -= other.x
+        self.y -= other.y
+        self.z -= other.z
+        return self
+
+    def __neg__(self):
+        return Quaternion(-self.w, -self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        if isinstance(other, Quaternion):
+            w1, x1, y1, z1 = self.w, self.x, self.y, self.z
+            w2, x2, y2, z2 = other.w, other.x, other.y, other.z
+            return Quaternion(
+                    w1*w2 - x1*x2 - y1*y2 - z1*z2,
+                    w1*x2 + x1*w2 + y1*z2 - z1*y2,
+                    w1*y2 - x1*z2 + y1*w2 + z1*x2,
+                    w1*z2 + x1*y2 - y1*x2 + z1*w2)
+        elif isinstance(other, QuaternionArray):
+            return QuaternionArray(_multiply(self.components, other.array),
+                    copy=False)
+        elif isinstance(other, numbers.Number) or np.ndim(other) == 0:
+            return Quaternion(self.w * other, self.x * other,
+                    self.y * other, self.z * other)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        if isinstance(other, numbers.Number) or np.ndim(other) == 0:
+            return self * other
+        else:
+            return NotImplemented
+
+    def __imul__(self, other):
+        return self.set(self * other)
+
+    def __truediv__(self, other):
+        if isinstance(other, numbers.Number) or np.ndim(other) == 0:
+            return self * (1 / other)
+        else:
+            return NotImplemented
+
+    __div__ = __truediv__
+
+    def __pow__(self, power):
+        return (self.log() * power).exp()
+
+    def __eq__(self, other):
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return self.w == other.w and self.x == other.x and \
+                self.y == other.y and self.z == other.z
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = object.__hash__
+
+    def __reduce__(self):
+        return (Quaternion, (self.w, self.x, self.y, self.z))
+
+    def __repr__(self):
+        return "Quaternion(%r, %r, %r, %r)" % (self.w, self.x, self.y, self.z)
+
+    def log(self):
+        """
+        Natural logarithm of this quaternion.
+        """
+        vnorm = math.sqrt(self.x**2 + self.y**2 + self.z**2)
+        magnitude = math.sqrt(self.w**2 + vnorm**2)
+        if vnorm == 0:
+            return Quaternion(math.log(magnitude), 0, 0, 0)
+        scale = math.atan2(vnorm, self.w) / vnorm
+        return Quaternion(math.log(magnitude),
+                self.x * scale, self.y * scale, self.z * scale)
+
+    def exp(self):
+        """
+        Exponential of this quaternion.
+        """
+        vnorm = math.sqrt(self.x**2 + self.y**2 + self.z**2)
+        e = math.exp(self.w)
+        if vnorm == 0:
+            return Quaternion(e, 0, 0, 0)
+        scale = e * math.sin(vnorm) / vnorm
+        return Quaternion(e * math.cos(vnorm),
+                self.x * scale, self.y * scale, self.z * scale)
+
+    def copy(self):
+        """
+        Obtain a copy of this quaternion.
+        """
+        return Quaternion(self.w, self.x, self.y, self.z)
+
+    def normalise(self):
+        """
+        Normalise this quaternion to unit length.
+
+        @return: This quaternion, for convenience.
+        """
+        scale = 1 / self.magnitude
+        self.w *= scale
+        self.x *= scale
+        self.y *= scale
+        self.z *= scale
+        return self
+
+    def negate(self):
+        """
+        Negate this quaternion.
+        """
+        self.w = -self.w
+        self.x = -self.x
+        self.y = -self.y
+        self.z = -self.z
+
+    def dot(self, other):
+        """
+        Compute the dot product of this quaternion with another.
+        """
+        return self.w*other.w + self.x*other.x + self.y*other.y + \
+                self.z*other.z
+
+    def _rotationMatrix(self):
+        # Matrix of the linear map v -> q*v*q.conjugate, which is the
+        # rotation matrix of this quaternion scaled by its squared magnitude.
+        w, x, y, z = self.w, self.x, self.y, self.z
+        ww, xx, yy, zz = w*w, x*x, y*y, z*z
+        xy, xz, yz = x*y, x*z, y*z
+        wx, wy, wz = w*x, w*y, w*z
+        return np.array((
+            (ww + xx - yy - zz, 2*(xy - wz), 2*(xz + wy)),
+            (2*(xy + wz), ww - xx + yy - zz, 2*(yz - wx)),
+            (2*(xz - wy), 2*(yz + wx), ww - xx - yy + zz)))
+
+    def rotateVector(self, v):
+        """
+        Rotate vectors using this quaternion.
+
+        Equivalent to M{q*v*q.conjugate}.
+
+        @param v: 3xN array of column vectors.
+        @return: The vectors as they appear in their current co-ordinate frame
+            after applying the rotation specified by this quaternion to them.
+        """
+        return np.dot(self._rotationMatrix(), v)
+
+    def rotateFrame(self, v):
+        """
+        Rotate co-ordinate frame of vectors using this quaternion.
+
+        Equivalent to M{q.conjugate*v*q}.
+
+        @param v: 3xN array of column vectors.
+        @return: The vectors as they appear in the rotated co-ordinate frame
+            obtained by applying the rotation specified by this quaternion to
+            their current co-ordinate frame.
+        """
+        return np.dot(self._rotationMatrix().T, v)
+
+    def toMatrix(self):
+        """
+        Obtain a 3x3 rotation matrix equivalent to the rotation specified by
+        this quaternion.
+        """
+        return self.copy().normalise()._rotationMatrix()
+
+    def toAxisAngle(self):
+        """
+        Obtain the axis and angle of rotation specified by this quaternion.
+
+        @return: Unit 3x1 rotation axis and rotation angle in radians.
+        """
+        vnorm = math.sqrt(self.x**2 + self.y**2 + self.z**2)
+        angle = 2 * math.atan2(vnorm, self.w)
+        if vnorm == 0:
+            return vectors.vector(1, 0, 0), angle
+        return self.vector / vnorm, angle
+
+    def toEuler(self, order='zyx', inDegrees=True):
+        """
+        Convert this quaternion to a corresponding Euler angle sequence.
+
+        @param order: The order of the desired Euler angle sequence. Choices
+            are 'zyx' for standard aerospace sequence (default),
+            or 'zxy' for order used in BVH files.
+        @param inDegrees: True to obtain angles in degrees (default), or False
+            for radians.
+        @return: Sequence of Euler angles.
+        """
+        return matrixToEuler(self.toMatrix(), order, inDegrees)
+
+    def set(self, other):
+        """
+        Set the components of this quaternion from another quaternion.
+
+        @return: This quaternion, for convenience.
+        """
+        self.w = other.w
+        self.x = other.x
+        self.y = other.y
+        self.z = other.z
+        return self
+
+    def setFromMatrix(self, m):
+        """
+        Set this quaternion to be equivalent to a given 3x3 rotation matrix.
+
+        @return: This quaternion, for convenience.
+        """
+        m = np.asarray(m)
+        trace = m[0,0] + m[1,1] + m[2,2]
+        if trace > 0:
+            s = 0.5 / math.sqrt(trace + 1)
+            self.w = 0.25 / s
+            self.x = (m[2,1] - m[1,2]) * s
+            self.y = (m[0,2] - m[2,0]) * s
+            self.z = (m[1,0] - m[0,1]) * s
+        elif m[0,0] > m[1,1] and m[0,0] > m[2,2]:
+            s = 2 * math.sqrt(1 + m[0,0] - m[1,1] - m[2,2])
+            self.w = (m[2,1] - m[1,2]) / s
+            self.x = 0.25 * s
+            self.y = (m[0,1] + m[1,0]) / s
+            self.z = (m[0,2] + m[2,0]) / s
+        elif m[1,1] > m[2,2]:
+            s = 2 * math.sqrt(1 + m[1,1] - m[0,0] - m[2,2])
+            self.w = (m[0,2] - m[2,0]) / s
+            self.x = (m[0,1] + m[1,0]) / s
+            self.y = 0.25 * s
+            self.z = (m[1,2] + m[2,1]) / s
+        else:
+            s = 2 * math.sqrt(1 + m[2,2] - m[0,0] - m[1,1])
+            self.w = (m[1,0] - m[0,1]) / s
+            self.x = (m[0,2] + m[2,0]) / s
+            self.y = (m[1,2] + m[2,1]) / s
+            self.z = 0.25 * s
+        return self
+
+    def setFromVectors(self, x, y, z):
+        """
+        Set this quaternion so that it acts as a rotation taking the e1,e2,e3
+        basis vectors to x,y,z.
+
+        The resulting quaternion satisfies C{q.rotateFrame(e1) == x}, etc.
+
+        @return: This quaternion, for convenience.
+        """
+        return self.setFromMatrix(np.vstack((np.ravel(x), np.ravel(y),
+            np.ravel(z))))
+
+    def setFromEuler(self, angles, order='zyx', inDegrees=True):
+        """
+        Set this quaternion from an Euler angle sequence.
+
+        @param angles: Sequence of 3 Euler angles.
+        @param order: The order to apply the Euler angle sequence.
+        @param inDegrees: True to indicate that angles are in degrees (default),
+            or False for radians.
+        @return: This quaternion, for convenience.
+        """
+        angles = np.asarray(angles).ravel()
+        if inDegrees:
+            angles = np.radians(angles)
+        result = Quaternion()
+        for axis, angle in zip(order.lower(), angles):
+            components = [math.cos(angle / 2), 0, 0, 0]
+            components[_AXES[axis]] = math.sin(angle / 2)
+            result = result * Quaternion(*components)
+        return self.set(result)
+
+def QuaternionFactory(w, x, y, z):
+    """
+    Factory to create Quaternions or QuaternionArrays depending on the length
+    of the arguments.
+    """
+    if np.ndim(w) == 0:
+        return Quaternion(w, x, y, z)
+    else:
+        return QuaternionArray((w, x, y, z))
+
+def QuaternionFromEuler(angles, order='zyx', inDegrees=True):
+    """
+    Construct a quaternion from an Euler angle sequence.
+
+    @param angles: Sequence of 3 Euler angles.
+    @param order: The order to apply the Euler angle sequence.
+    @param inDegrees: True to indicate that angles are in degrees (default),
+        or False for radians.
+    """
+    return Quaternion().setFromEuler(angles, order, inDegrees)
+
+def QuaternionFromVectors(x, y, z):
+    """
+    Create a quaternion that acts as a rotation taking the e1,e2,e3 basis
+    vectors to x,y,z.
+    """
+    return Quaternion().setFromVectors(x, y, z)
+
+def QuaternionFromMatrix(m):
+    """
+    Create a quaternion from a rotation matrix.
+    """
+    return Quaternion().setFromMatrix(m)
+
+def QuaternionFromAxisAngle(axis, angle):
+    """
+    Create a quaternion from an axis and angle.
+
+    @param axis: 3x1 rotation axis.
+    @param angle: Rotation angle in radians.
+    """
+    axis = np.asarray(axis).ravel()
+    axis = axis / math.sqrt(np.dot(axis, axis))
+    s = math.sin(angle / 2)
+    return Quaternion(math.cos(angle / 2), axis[0] * s, axis[1] * s,
+            axis[2] * s)
+
+def QuaternionNaN():
+    """
+    Create a quaternion with all components NaN.
+    """
+    return Quaternion(np.nan, np.nan, np.nan, np.nan)
+
+Quaternion.fromEuler = staticmethod(QuaternionFromEuler)
+Quaternion.fromVectors = staticmethod(QuaternionFromVectors)
+Quaternion.fromMatrix = staticmethod(QuaternionFromMatrix)
+Quaternion.fromAxisAngle = staticmethod(QuaternionFromAxisAngle)
+Quaternion.nan = staticmethod(QuaternionNaN)
+
+class QuaternionArray(object):
+    """
+    An array of quaternion values.
+
+    The components are held in an Nx4 L{np.ndarray}, with columns w,x,y,z,
+    and all operations are applied to the whole array at once.
+
+    Math operators are overridden to support quaternion math operations.
+    """
+
+    # Prevent numpy from converting these arrays to arrays of Quaternion
+    # objects when combined with numpy types.
+    __array_ufunc__ = None
+
+    def __init__(self, data, copy=True):
+        """
+        Construct quaternion array.
+
+        A L{QuaternionArray} can be constructed from:
+            - A sequence of L{Quaternion} objects.
+            - A 4-element list or tuple of arrays giving w,x,y,z components.
+            - An Nx4 array of quaternion component values.
+            - Another L{QuaternionArray}.
+
+        @param data: Data from which to construct the array.
+        @param copy: If the source is an existing Nx4 array or
+            L{QuaternionArray},  whether to copy the data. If not it will be
+            referenced in place.
+        """
+        if isinstance(data, QuaternionArray):
+            self.array = data.array.copy() if copy else data.array
+        elif isinstance(data, (list, tuple)):
+            if all(isinstance(q, Quaternion) for q in data):
+                self.array = np.array([(q.w, q.x, q.y, q.z) for q in data],
+                        dtype=float).reshape((-1,4))
+            elif len(data) == 4:
+                self.array = np.empty((len(data[0]), 4))
+                for i, component in enumerate(data):
+                    self.array[:,i] = component
+            else:
+                raise ValueError("List or tuple data must be a sequence of "
+                        "Quaternions or a sequence of w,x,y,z arrays")
+        elif isinstance(data, np.ndarray):
+            if data.ndim != 2 or data.shape[1] != 4:
+                raise ValueError("Array data must be Nx4, got %r"
+                        % (data.shape,))
+            if copy:
+                self.array = np.array(data, dtype=float)
+            else:
+                self.array = np.asarray(data, dtype=float)
+        else:
+            raise TypeError("Cannot construct QuaternionArray from type %r"
+                    % type(data))
+
+    @property
+    def w(self):
+        return self.array[:,0]
+
+    @w.setter
+    def w(self, value):
+        self.array[:,0] = value
+
+    @property
+    def x(self):
+        return self.array[:,1]
+
+    @x.setter
+    def x(self, value):
+        self.array[:,1] = value
+
+    @property
+    def y(self):
+        return self.array[:,2]
+
+    @y.setter
+    def y(self, value):
+        self.array[:,2] = value
+
+    @property
+    def z(self):
+        return self.array[:,3]
+
+    @z.setter
+    def z(self, value):
+        self.array[:,3] = value
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, numbers.Integral):
+            return Quaternion(*self.array[index])
+        else:
+            return QuaternionArray(self.array[index], copy=False)
+
+    def __setitem__(self, index, value):
+        self.array[index] = _components(value)
+
+    def __iter__(self):
+        for w, x, y, z in self.array:
+            yield Quaternion(w, x, y, z)
+
+    def __eq__(self, other):
+        if not isinstance(other, QuaternionArray):
+            return NotImplemented
+        return np.array_equal(self.array, other.array)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __add__(self, other):
+        if not isinstance(other, (Quaternion, QuaternionArray)):
+            return NotImplemented
+        return QuaternionArray(self.array + _components(other), copy=False)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if not isinstance(other, (Quaternion, QuaternionArray)):
+            return NotImplemented
+        return QuaternionArray(self.array - _components(other), copy=False)
+
+    def __rsub__(self, other):
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return QuaternionArray(other.components - self.array, copy=False)
+
+    def __neg__(self):
+        return QuaternionArray(-self.array, copy=False)
+
+    def __mul__(self, other):
+        if isinstance(other, (Quaternion, QuaternionArray)):
+            return QuaternionArray(_multiply(self.array, _components(other)),
+                    copy=False)
+        else:
+            return self._scaled(other)
+
+    def __rmul__(self, other):
+        if isinstance(other, Quaternion):
+            return QuaternionArray(_multiply(other.components, self.array),
+                    copy=False)
+        else:
+            return self._scaled(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, (Quaternion, QuaternionArray)):
+            return NotImplemented
+        return self._scaled(1 / np.asarray(other, dtype=float))
+
+    __div__ = __truediv__
+
+    def _scaled(self, scale):
+        # Multiply by a scalar, or elementwise by a length N array.
+        scale = np.asarray(scale, dtype=float)
+        if scale.ndim > 1:
+            return NotImplemented
+        return QuaternionArray(self.array * scale[...,np.newaxis], copy=False)
+
+    def __pow__(self, power):
+        power = np.asarray(power, dtype=float)
+        return QuaternionArray(_exp(_log(self.array) * power[...,np.newaxis]),
+                copy=False)
+
+    def __repr__(self):
+        return "QuaternionArray(%r)" % self.array
+
+    def copy(self):
+        """
+        Obtain a copy of this array.
+        """
+        return QuaternionArray(self)
+
+    def log(self):
+        """
+        Natural logarithm of the quaternions.
+        """
+        return QuaternionArray(_log(self.array), copy=False)
+
+    def exp(self):
+        """
+        Exponential of the quaternions.
+        """
+        return QuaternionArray(_exp(self.array), copy=False)
+
+    def dot(self, other):
+        """
+        Dot product with another quaternion array.
+        """
+        if not isinstance(other, QuaternionArray):
+            raise TypeError("Only QuaternionArrays are supported for dot "
+                    "product")
+        return np.sum(self.array * other.array, axis=1)
+
+    @property
+    def magnitude(self):
+        """
+        Magnitudes of the quaternions.
+        """
+        return np.sqrt(np.sum(self.array**2, axis=1))
+
+    @property
+    def norm(self):
+        """
+        The 2-norms of these quaternions.
+        """
+        return self.magnitude
+
+    def rotateVector(self, v):
+        """
+        Rotate vectors by the rotations of these quaternions.
+
+        Equivalent to M{q*v*q.conjugate} for each q and v.
+
+        @param v: 3xN array of column vectors, where N is equal to the
+            length of this quaternion array.
+        @return: The vectors as they appear in their current co-ordinate frame
+            after applying the rotations specified by these quaternions to
+            them.
+        """
+        return _rotate(self.array, v, 1)
+
+    def rotateFrame(self, v):
+        """
+        Rotate co-ordinate frames of vectors using these quaternions.
+
+        Equivalent to M{q.conjugate*v*q} for each q and v.
+
+        @param v: 3xN array of column vectors, where N is equal to the
+            length of this quaternion array.
+        @return: The vectors as they appear in the rotated co-ordinate frames
+            obtained by applying the rotations given by these quaternions to
+            their current co-ordinate frame.
+        """
+        return _rotate(self.array, v, -1)
+
+    @property
+    def vector(self):
+        """
+        The (imaginary) column vector components of these quaternions.
+        """
+        return self.array[:,1:].T
+
+    @property
+    def conjugate(self):
+        """
+        The conjugates of these quaternions.
+        """
+        return QuaternionArray(self.array * (1, -1, -1, -1), copy=False)
+
+    def validity(self):
+        """
+        Obtain a boolean array indicating which elements are valid.
+        """
+        return ~np.any(np.isnan(self.array), axis=1)
+
+    def unflipped(self):
+        """
+        Obtain a copy of this array with no sign flips between values.
+
+        Invalid elements are skipped when comparing neighbouring values.
+        """
+        valid = np.flatnonzero(self.validity())
+        signs = np.ones(len(self))
+        if len(valid) > 1:
+            dots = np.sum(self.array[valid[1:]] * self.array[valid[:-1]],
+                    axis=1)
+            signs[valid[1:]] = np.cumprod(np.where(dots < 0, -1, 1))
+        return QuaternionArray(self.array * signs[:,np.newaxis], copy=False)
+
+    def smoothed(self, stddev=0.001):
+        """
+        Obtain a smoothed array of quaternions.
+
+        Smoothing is perfomed using a cubic spline for each quaternion
+        component. It is assumed that the time between quaternions is
+        constant.
+
+        @param stddev: Standard deviation of the noise expected in each
+            component.
+        """
+        from imusim.maths.vector_splines import PartialInputVectorSpline
+        t = np.arange(len(self))
+        spl = PartialInputVectorSpline(t, self.array.T, stddev=stddev)
+        smoothedData = spl(t).T
+        smoothedData /= np.sqrt(np.sum(smoothedData**2, axis=1))[:,np.newaxis]
+        return QuaternionArray(smoothedData, copy=False)
+
+    def toAxisAngle(self):
+        """
+        Obtain the axis and angle of rotations specified by these quaternions.
+
+        @return: 3xN array of unit rotation axes and length N array of
+            rotation angles in radians.
+        """
+        vnorm = vectors.norm(self.vector)
+        angles = 2 * np.arctan2(vnorm, self.w)
+        axes = self.vector / np.where(vnorm == 0, 1, vnorm)
+        axes[0, vnorm == 0] = 1
+        return axes, angles
+
+def QuaternionArrayNaN(length):
+    """
+    Create a L{QuaternionArray} with all components NaN.
+
+    @param length: Number of quaternions in the array.
+    """
+    result = np.empty((length, 4))
+    result.fill(np.nan)
+    return QuaternionArray(result, copy=False)
+
+QuaternionArray.nan = staticmethod(QuaternionArrayNaN)
+
+def slerp(q1, q2, t):
+    """
+    Spherical linear interpolation between quaternions.
+
+    Interpolation follows the shortest path between each pair of rotations.
+
+    @param q1: L{Quaternion} or L{QuaternionArray} at t=0.
+    @param q2: L{Quaternion} or L{QuaternionArray} at t=1.
+    @param t: Interpolation parameter, or length N array of parameters.
+    @return: L{Quaternion} if all arguments are single values, otherwise a
+        L{QuaternionArray}.
+    """
+    a = _components(q1)
+    b = _components(q2)
+    t = np.asarray(t, dtype=float)
+    single = a.ndim == 1 and b.ndim == 1 and t.ndim == 0
+    a = np.atleast_2d(a)
+    b = np.atleast_2d(b)
+    t = np.atleast_1d(t)[:,np.newaxis]
+    cosOmega = np.sum(a * b, axis=1)[:,np.newaxis]
+    b = np.where(cosOmega < 0, -b, b)
+    cosOmega = np.abs(cosOmega)
+    omega = np.arccos(np.minimum(cosOmega, 1))
+    sinOmega = np.sin(omega)
+    # Fall back to linear interpolation where the quaternions are too close
+    # for the sine ratios to be computed accurately.
+    close = sinOmega < 1e-9
+    sinOmega[close] = 1
+    s1 = np.where(close, 1 - t, np.sin((1 - t) * omega) / sinOmega)
+    s2 = np.where(close, t, np.sin(t * omega) / sinOmega)
+    result = s1 * a + s2 * b
+    if single:
+        return Quaternion(*result[0])
+    else:
+        return QuaternionArray(result, copy=False)
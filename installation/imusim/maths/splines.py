@@ -23,7 +23,13 @@ import numpy as np
 from abc import ABCMeta, abstractmethod, abstractproperty
 from scipy.interpolate import splrep, splev
 from itertools import izip
+from collections import namedtuple
 import math
+import time
+import os
+import hashlib
+import tempfile
+import cPickle as pickle
 
 class Spline(object):
 
@@ -164,6 +170,8 @@ class PartialInputSpline(Spline):
         xends = [s.validTo for s in self.splines]
         self.validRegions = zip(xstarts, xends)
         self.regions = zip(xstarts, xends, self.splines)
+        self._starts = np.array(xstarts)
+        self._ends = np.array(xends)
 
     def _validity(self, y):
         """
@@ -180,8 +188,8 @@ class PartialInputSpline(Spline):
         This method should be overridden by subclasses using other data types.
 
         @param x: Input values, length N L{np.ndarray}.
-        @param conditions: List of length N boolean arrays identifying the
-            indices of x for which each set of results should be applied.
+        @param conditions: List of index arrays identifying the indices of x
+            for which each set of results should be applied.
         @param results: List of spline results, types as appropriate, with
             lengths corresponding to the number of True values in each
             condition array.
@@ -204,15 +212,25 @@ class PartialInputSpline(Spline):
 
     def __call__(self, x, *args, **kwargs):
         X = np.atleast_1d(x)
-        conditions = np.atleast_2d([(X>=start) & (X<=end)
-            for start,end in self.validRegions])
-        undefined = ~np.any(conditions, axis=0)
-        if np.all(undefined):
-            results = []
-            conditions = []
-        else:
-            results, conditions = zip(*[(s(X[c], *args, **kwargs), c)
-                for c,s in izip(conditions, self.splines) if X[c].size > 0])
+        # The regions are disjoint and in increasing order, so each input
+        # value can only lie in the last region starting at or before it.
+        region = np.searchsorted(self._starts, X, 'right') - 1
+        with np.errstate(invalid='ignore'):
+            undefined = (region < 0) | \
+                    ~(X <= self._ends[np.maximum(region, 0)])
+        region[undefined] = -1
+
+        # Group the indices of the input values by region, and evaluate each
+        # spline only at the values within its region.
+        order = np.argsort(region, kind='mergesort')
+        bounds = np.searchsorted(region[order], np.arange(len(self.splines)+1))
+        results = []
+        conditions = []
+        for spline, start, end in izip(self.splines, bounds[:-1], bounds[1:]):
+            if end > start:
+                indices = order[start:end]
+                results.append(spline(X[indices], *args, **kwargs))
+                conditions.append(indices)
         return self._output(x, conditions, results, undefined)
 
     @property
@@ -222,3 +240,182 @@ class PartialInputSpline(Spline):
     @property
     def validTo(self):
         return self.splines[-1].validTo
+
+#: Timing of a single spline fit.
+#:
+#: The fields are the name of the fitting function, the number of data points
+#: fitted, the time taken in seconds, and whether the result was loaded from
+#: the cache rather than fitted.
+SplineFitTiming = namedtuple('SplineFitTiming',
+        'function points duration cached')
+
+class SplineFitter(object):
+    """
+    Performs spline fits, optionally in parallel, and records their timings.
+
+    A fit is a call of a fitting function with a data sequence, such as a
+    L{TimeSeries} of keyframes, and further arguments. Fits may be submitted
+    in advance, in which case they are carried out by a pool of worker
+    threads or processes while the caller continues. The result of a fit is
+    obtained with L{fit}, which waits for a submitted fit to complete or
+    performs the fit immediately if it was not submitted.
+
+    For a process pool, the fitting function must be defined at the top
+    level of a module, and its arguments and result must be picklable.
+
+    If a cache directory is given, the result of each fit is saved there in
+    a file named by a hash of the fitting function, the data and the further
+    arguments. A later fit of the same data with the same arguments loads
+    the result instead of fitting again. The hash covers the name of the
+    fitting function but not its code, so L{CACHE_VERSION} must be changed
+    when the results of existing fitting functions change.
+
+    @ivar pool: A L{multiprocessing.Pool} or L{multiprocessing.pool.ThreadPool}
+        to perform submitted fits, or None to perform all fits in the calling
+        thread.
+    @ivar cacheDirectory: Directory in which to cache fit results, or None.
+    @ivar timings: List of L{SplineFitTiming} for each fit obtained.
+    """
+
+    #: Version of the fit results, included in the hash of each cached fit.
+    CACHE_VERSION = 2
+
+    def __init__(self, pool=None, cacheDirectory=None):
+        """
+        Initialise spline fitter.
+
+        @param pool: A L{multiprocessing.Pool} or
+            L{multiprocessing.pool.ThreadPool} to perform submitted fits, or
+            None to perform all fits in the calling thread.
+        @param cacheDirectory: Directory in which to cache fit results, or
+            None to disable caching. It is created if it does not exist.
+        """
+        self.pool = pool
+        self.cacheDirectory = cacheDirectory
+        self.timings = []
+        self._pending = {}
+        if cacheDirectory is not None and not os.path.isdir(cacheDirectory):
+            os.makedirs(cacheDirectory)
+
+    def submit(self, function, data, *args):
+        """
+        Start a fit in the pool, if one is in use and the result is not cached.
+
+        @param function: Fitting function to call.
+        @param data: Data sequence to pass as the first argument.
+        @param args: Further hashable arguments to pass.
+        """
+        if self.pool is None:
+            return
+        key = (function, id(data)) + args
+        if key not in self._pending:
+            if self.cacheDirectory is not None and \
+                    os.path.exists(self._cacheFilename(function, data, args)):
+                return
+            # The data is kept with the result so that its id is not reused
+            # while the fit is pending.
+            self._pending[key] = (data, self.pool.apply_async(_timedFit,
+                (function, data) + args))
+
+    def fit(self, function, data, *args):
+        """
+        Obtain the result of a fit.
+
+        @param function: Fitting function to call.
+        @param data: Data sequence to pass as the first argument.
+        @param args: Further hashable arguments to pass.
+        @return: The result of the fitting function.
+        """
+        key = (function, id(data)) + args
+        filename = None
+        if self.cacheDirectory is not None:
+            filename = self._cacheFilename(function, data, args)
+        if key in self._pending:
+            data, pending = self._pending.pop(key)
+            result, timing, error = pending.get()
+        else:
+            start = time.time()
+            result = self._load(filename)
+            if result is not None:
+                self.timings.append(SplineFitTiming(function.__name__,
+                    len(data), time.time() - start, True))
+                return result
+            result, timing, error = _timedFit(function, data, *args)
+        self.timings.append(timing)
+        if error is not None:
+            raise Spline.InsufficientPointsError, error
+        if filename is not None:
+            self._save(filename, result)
+        return result
+
+    def _cacheFilename(self, function, data, args):
+        """
+        Name of the file caching the result of a fit.
+        """
+        digest = hashlib.sha1()
+        digest.update(repr((self.CACHE_VERSION, function.__module__,
+            function.__name__, args)))
+        if hasattr(data, 'timestamps'):
+            arrays = [data.timestamps, data.values]
+        else:
+            arrays = [data]
+        for array in arrays:
+            array = np.ascontiguousarray(getattr(array, 'array', array))
+            digest.update(repr((array.dtype.str, array.shape)))
+            digest.update(array.tostring())
+        return os.path.join(self.cacheDirectory, digest.hexdigest() + '.pickle')
+
+    @staticmethod
+    def _load(filename):
+        """
+        Load a cached fit result, returning None if it is not available.
+        """
+        if filename is None or not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Unpickling a damaged or outdated file can fail in many ways;
+            # the result is then fitted again and the file replaced.
+            return None
+
+    def _save(self, filename, result):
+        """
+        Save a fit result to the cache.
+
+        The result is written to a temporary file that is then renamed, so
+        that concurrent readers never see a partially written file. The
+        temporary file is removed if it could not be renamed.
+        """
+        handle, temporary = tempfile.mkstemp(dir=self.cacheDirectory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temporary, filename)
+        except EnvironmentError:
+            # Failing to write the cache, or another process having cached
+            # the same result first, does not affect the fit itself.
+            pass
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+def _timedFit(function, data, *args):
+    """
+    Perform a fit and time it.
+
+    L{Spline.InsufficientPointsError} is returned as a message rather than
+    raised, as it cannot be pickled to return it from a worker process.
+
+    @return: Tuple of the result, L{SplineFitTiming} and error message.
+    """
+    start = time.time()
+    try:
+        result = function(data, *args)
+        error = None
+    except Spline.InsufficientPointsError, e:
+        result = None
+        error = str(e)
+    return result, SplineFitTiming(function.__name__, len(data),
+            time.time() - start, False), error
@@ -22,8 +22,9 @@ from abc import ABCMeta, abstractmethod, abstractproperty
 from scipy import interpolate
 from imusim.maths import vectors
 from imusim.utilities.documentation import prepend_method_doc
-from imusim.maths.natural_neighbour import NaturalNeighbourInterpolatorC
+from imusim.maths.natural_neighbour import NaturalNeighbourInterpolator
 import numpy as np
+import os
 
 class VectorField(object):
     """
@@ -107,7 +108,7 @@ class RBFInterpolatedField(InterpolatedVectorField):
 
     def __call__(self, position, t):
         length = np.shape(position)[-1]
-        nblocks = min(1, length/500)
+        nblocks = max(1, length // 500)
         inblocks = np.array_split(position, nblocks, axis=1)
         outblocks = [np.array([np.atleast_1d(c(*(list(ib))))
             for c in self.components]) for ib in inblocks]
@@ -117,11 +118,15 @@ class NaturalNeighbourInterpolatedField(InterpolatedVectorField):
     """
     Natural Neighbour interpolation of vector fields.
 
-    This is a Python wrapper for the C implementation by Ross Hemsley, described
-    in the report "Interpolation on a Magnetic Field", Bristol University, 2009.
+    This uses the Sibson interpolation method of the C implementation by Ross
+    Hemsley, described in the report "Interpolation on a Magnetic Field",
+    Bristol University, 2009, reimplemented in L{natural_neighbour}.
 
     The original code and report are available from:
     http://code.google.com/p/interpolate3d/
+
+    Deviations from the median of the samples are interpolated, so the field
+    tends to its median value outside the sampled region.
     """
     def __init__(self, positions, values):
 
@@ -132,15 +137,10 @@ class NaturalNeighbourInterpolatedField(InterpolatedVectorField):
         self._baseField = np.median(values[:,valid], axis=1).reshape(3,1)
         deviations = values - self._baseField
 
-        u,v,w = values
+        u,v,w = deviations
 
-        self.imp = NaturalNeighbourInterpolatorC(
-            np.ascontiguousarray(x[valid]),
-            np.ascontiguousarray(y[valid]),
-            np.ascontiguousarray(z[valid]),
-            np.ascontiguousarray(u[valid]),
-            np.ascontiguousarray(v[valid]),
-            np.ascontiguousarray(w[valid]))
+        self.imp = NaturalNeighbourInterpolator(
+            x[valid], y[valid], z[valid], u[valid], v[valid], w[valid])
 
     @property
     def nominalValue(self):
@@ -152,3 +152,234 @@ class NaturalNeighbourInterpolatedField(InterpolatedVectorField):
         result[:,~valid] = np.nan
         result[:,valid] = self.imp(*(list(position[:,valid])))
         return self._baseField + result
+
+class GridCachedField(VectorField):
+    """
+    A static vector field cached on a regular grid for fast evaluation.
+
+    The field is evaluated once at every point of a regular 3D grid covering
+    a region of interest, and subsequently evaluated anywhere within that
+    region by trilinear or tricubic Lagrange interpolation between the grid
+    values. Positions outside the region are evaluated using the original
+    field.
+
+    If a tolerance is given, the grid spacing is halved until the largest
+    interpolation error at the midpoints of the grid cells and their edges
+    is within it.
+
+    The grid values may be saved to a file, from which they are loaded by
+    later instances wrapping the same field over the same region instead of
+    being evaluated again.
+
+    @ivar field: The original field.
+    @ivar lower: 3x1 L{np.ndarray} of the lowest co-ordinates of the region.
+    @ivar upper: 3x1 L{np.ndarray} of the highest co-ordinates of the region.
+    @ivar spacing: 3x1 L{np.ndarray} of the final grid spacing.
+    @ivar order: Order of the interpolation, 1 for trilinear or 3 for
+        tricubic interpolation.
+    @ivar error: Largest interpolation error found at the check points when
+        the grid was built, or None if no tolerance was given.
+    """
+
+    #: Number of positions at which the field is evaluated in one call.
+    BLOCK_SIZE = 100000
+
+    def __init__(self, field, lower, upper, spacing, order=1, tolerance=None,
+            filename=None, maxPoints=10**7):
+        """
+        Construct grid cached field.
+
+        @param field: The static field to cache. It is evaluated at time 0.
+        @param lower: Sequence of the lowest x, y and z co-ordinates of the
+            region to cache.
+        @param upper: Sequence of the highest x, y and z co-ordinates of the
+            region to cache. These are rounded up to a whole number of grid
+            cells.
+        @param spacing: Initial grid spacing, either a scalar or a sequence of
+            spacings in x, y and z.
+        @param order: Order of the interpolation, 1 for trilinear or 3 for
+            tricubic interpolation.
+        @param tolerance: Largest acceptable interpolation error, as the norm
+            of the difference between interpolated and true field vectors at
+            the midpoints of the grid cells and their edges. If None, the
+            initial spacing is used.
+        @param filename: Name of an .npz file in which to save the grid
+            values, or from which to load them if it was saved with the same
+            region, spacing, order and tolerance and matches the field at the
+            grid corners.
+        @param maxPoints: Largest number of grid points to use when refining
+            the grid to meet the tolerance.
+        """
+        if order not in (1, 3):
+            raise ValueError, "Interpolation order must be 1 or 3"
+
+        self.field = field
+        self.order = order
+        self.lower = np.asarray(lower, dtype=float).reshape(3,1)
+        self.spacing = np.ones((3,1)) * np.reshape(spacing, (-1,1))
+        self.error = None
+
+        # Offsets from the base grid point of the points used to interpolate
+        # within a cell. Tricubic interpolation needs an extra layer of grid
+        # points around the region.
+        self._offsets = np.arange(order + 1) - (order - 1) // 2
+        self._margin = (order - 1) // 2
+
+        upper = np.asarray(upper, dtype=float).reshape(3,1)
+        parameters = np.hstack((self.lower, upper, self.spacing,
+            np.tile(np.nan if tolerance is None else tolerance, (3,1)),
+            np.tile(order, (3,1))))
+
+        if filename is not None and os.path.exists(filename):
+            if self._load(filename, parameters):
+                return
+
+        while True:
+            cells = np.ceil((upper - self.lower) / self.spacing).astype(int)
+            counts = cells + 1 + 2 * self._margin
+            if np.prod(counts) > maxPoints:
+                raise ValueError, "Grid of %d points needed to meet " \
+                        "tolerance exceeds the maximum of %d" \
+                        % (np.prod(counts), maxPoints)
+            self._setValues(self._evaluate(self._gridPositions(counts,
+                self._origin)).reshape((3,) + tuple(counts.ravel())))
+            if tolerance is None:
+                break
+            self.error = max(np.max(vectors.norm(
+                self._interpolate(p) - self._evaluate(p)))
+                for p in self._checkPositions(cells))
+            if self.error <= tolerance:
+                break
+            self.spacing = self.spacing / 2
+
+        if filename is not None:
+            np.savez(filename, parameters=parameters, spacing=self.spacing,
+                    values=self._values,
+                    error=np.nan if self.error is None else self.error)
+
+    @property
+    def _origin(self):
+        """
+        Position of the first grid point.
+        """
+        return self.lower - self._margin * self.spacing
+
+    def _load(self, filename, parameters):
+        """
+        Load grid values saved with the given parameters from a file.
+
+        @return: True if the values were loaded, False if the file was saved
+            with different parameters or does not match the field.
+        """
+        data = np.load(filename)
+        if data['parameters'].shape != parameters.shape \
+                or not np.allclose(data['parameters'], parameters,
+                        rtol=0, atol=0, equal_nan=True):
+            return False
+        self.spacing = data['spacing']
+        values = data['values']
+        error = float(data['error'])
+        self.error = None if np.isnan(error) else error
+
+        # Check the saved values at the corners of the grid against the
+        # field, in case the field has changed since they were saved.
+        counts = np.array(values.shape[1:]).reshape(3,1)
+        indices = (counts - 1) * \
+                np.array([[(i >> j) & 1 for i in range(8)] for j in range(3)])
+        corners = self._origin + self.spacing * indices
+        if not np.allclose(values[(slice(None),) + tuple(indices)],
+                self._evaluate(corners), rtol=1e-10, atol=0):
+            return False
+        self._setValues(values)
+        return True
+
+    def _gridPositions(self, counts, origin):
+        """
+        Positions of the points of a grid with the given counts of points.
+        """
+        axes = [origin[i,0] + self.spacing[i,0] * np.arange(counts[i,0])
+                for i in range(3)]
+        return np.array([g.ravel() for g in np.meshgrid(*axes,
+            indexing='ij')])
+
+    def _checkPositions(self, cells):
+        """
+        Positions at which to check interpolation errors.
+
+        These are the midpoints of the cell edges along each axis, and the
+        cell centres, for the cells covering the region. Checking the centres
+        alone is not enough, as the curvatures of a harmonic field along the
+        three axes cancel there.
+        """
+        for axis in range(3):
+            offset = np.zeros((3,1), dtype=int)
+            offset[axis] = 1
+            yield self._gridPositions(cells + 1 - offset,
+                    self.lower + offset * self.spacing / 2)
+        yield self._gridPositions(cells, self.lower + self.spacing / 2)
+
+    def _evaluate(self, positions):
+        """
+        Evaluate the original field at the given positions in blocks.
+        """
+        blocks = range(0, positions.shape[1], self.BLOCK_SIZE)
+        return np.hstack([self.field(positions[:,i:i+self.BLOCK_SIZE], 0)
+            for i in blocks])
+
+    def _setValues(self, values):
+        self._values = values
+        self._counts = np.array(values.shape[1:]).reshape(3,1)
+        self.upper = self._origin + \
+                (self._counts - 1 - self._margin) * self.spacing
+
+    def _interpolate(self, positions):
+        """
+        Interpolate the grid values at positions within the region.
+        """
+        coordinates = (positions - self._origin) / self.spacing
+        base = np.clip(np.floor(coordinates).astype(int), -self._offsets[0],
+                self._counts - 1 - self._offsets[-1])
+        fraction = coordinates - base
+
+        # Lagrange interpolation weights of the points at each offset, for
+        # each axis.
+        weights = np.ones((len(self._offsets),) + positions.shape)
+        for i, a in enumerate(self._offsets):
+            for b in self._offsets:
+                if a != b:
+                    weights[i] *= (fraction - b) / (a - b)
+
+        # Gather the values from the grid flattened to columns, using the
+        # flat index of the base point plus that of each offset.
+        strides = np.array([self._counts[1,0] * self._counts[2,0],
+            self._counts[2,0], 1]).reshape(3,1)
+        index = np.sum(base * strides, axis=0)
+        values = self._values.reshape(3,-1)
+        result = np.zeros(positions.shape)
+        for i, a in enumerate(self._offsets):
+            for j, b in enumerate(self._offsets):
+                w = weights[i,0] * weights[j,1]
+                for k, c in enumerate(self._offsets):
+                    offset = np.dot(strides.T, [a, b, c])[0]
+                    result += (w * weights[k,2]) * \
+                            values.take(index + offset, axis=1)
+        return result
+
+    def __call__(self, position, t):
+        position = np.asarray(position, dtype=float)
+        valid = vectors.validity(position)
+        with np.errstate(invalid='ignore'):
+            inside = valid & np.all((position >= self.lower)
+                    & (position <= self.upper), axis=0)
+        outside = valid & ~inside
+        result = np.empty_like(position)
+        result[:,~valid] = np.nan
+        if np.any(inside):
+            result[:,inside] = self._interpolate(position[:,inside])
+        if np.any(outside):
+            result[:,outside] = self._evaluate(position[:,outside])
+        return result
+
+    @property
+    def nominalValue(self):
+        return self.field.nominalValue
@@ -1,7 +1,85 @@
-def __bootstrap__():
-   global __bootstrap__, __loader__, __file__
-   import sys, pkg_resources, imp
-   __file__ = pkg_resources.resource_filename(__name__,'vectors.pyd')
-   __loader__ = None; del __bootstrap__, __loader__
-   imp.load_dynamic(__name__,__file__)
-__bootstrap__()
+"""
+Functions for working with column vectors.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+
+def vector(*components):
+    """
+    Construct a column vector from its components.
+    """
+    return np.array(components, dtype=float).reshape((-1,1))
+
+def nan(length=1):
+    """
+    Obtain an array of column vectors with all components NaN.
+
+    @param length: Number of vectors in the array.
+    """
+    result = np.empty((3, length))
+    result.fill(np.nan)
+    return result
+
+def norm(v):
+    """
+    Compute the l2norm of an array of column vectors
+    """
+    v = np.asarray(v)
+    return np.sqrt(np.sum(v * v, axis=0))
+
+def _checkShapes(v1, v2):
+    if np.shape(v1) != np.shape(v2):
+        raise ValueError("Vectors must both have shape (%d,%d). "
+            "(v1.shape=%r, v2.shape=%r)" % (np.shape(v1)[0], np.shape(v1)[-1],
+                np.shape(v1), np.shape(v2)))
+
+def cross(v1, v2):
+    """
+    Compute the cross products of two arrays of column vectors.
+
+    Each array of vectors must have the same shape
+    """
+    _checkShapes(v1, v2)
+    v1 = np.asarray(v1)
+    v2 = np.asarray(v2)
+    if v1.shape[0] != 3:
+        raise ValueError("Vectors must both have shape (3,%d). "
+            "(v1.shape=%r, v2.shape=%r)" % (v1.shape[-1], v1.shape, v2.shape))
+    result = np.empty(v1.shape)
+    result[0] = v1[1] * v2[2] - v1[2] * v2[1]
+    result[1] = v1[2] * v2[0] - v1[0] * v2[2]
+    result[2] = v1[0] * v2[1] - v1[1] * v2[0]
+    return result
+
+def dot(v1, v2):
+    """
+    Compute the dot products of two arrays of column vectors.
+
+    Each array must have the same shape
+    """
+    _checkShapes(v1, v2)
+    return np.sum(np.asarray(v1) * np.asarray(v2), axis=0)
+
+def validity(v):
+    """
+    Return a boolean array indicating which vectors in an array of column
+    vectors do not contain NaN values.
+    """
+    return ~np.any(np.isnan(v), axis=0)
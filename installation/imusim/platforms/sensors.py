@@ -26,6 +26,7 @@ from imusim.simulation.base import Simulation
 from imusim.utilities.documentation import prepend_method_doc
 from imusim.maths.vectors import vector
 from imusim.maths.quaternions import Quaternion
+from imusim.maths.counter_rng import CounterRNG
 import numpy as np
 
 class Sensor(Component):
@@ -130,12 +131,36 @@ class NoisySensor(Sensor):
     def _simulationChange(self):
         Sensor._simulationChange(self)
         if self.platform.simulation is None:
-            self._rng = None
+            self._noise = None
         else:
-            self._rng = self.platform.simulation.subrng()
+            self._noise = CounterRNG(
+                    self.platform.simulation.subrng().randint(2**31))
+        self._sampleIndex = 0
 
     def noiseVoltages(self, t):
-        return self._rng.normal(size=(3,1), scale=self._noiseStdDev)
+        # Each call takes the next indices in the sample sequence, so that
+        # sampling an array of times gives the same values as sampling each
+        # time separately.
+        count = len(np.atleast_1d(t))
+        indices = np.arange(self._sampleIndex, self._sampleIndex + count)
+        self._sampleIndex += count
+        return self.sampleNoise(indices)
+
+    def sampleNoise(self, indices):
+        """
+        Generate noise voltages for given sample indices.
+
+        The noise for each sample depends only on the random number
+        generator of the simulation and on the sample index, so any block of
+        samples can be generated independently with the same result.
+
+        @param indices: Non-negative integer indices of the samples.
+        @return: 3xN L{np.ndarray} of noise voltages.
+        """
+        indices = np.atleast_1d(indices).astype(np.uint64)
+        counters = np.uint64(3) * indices + np.arange(3,
+                dtype=np.uint64)[:,np.newaxis]
+        return self._noise.normal(counters, scale=self._noiseStdDev)
 
 class TransformedSensor(Sensor):
     """
@@ -0,0 +1,102 @@
+"""
+Parallel simulation of independent IMUs.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+import inspect
+from imusim.simulation.base import Simulation
+from imusim.behaviours.imu import BasicIMUBehaviour, sampleIMU, canSampleIMU
+
+def simulateIMUs(imuClass, trajectories, samplingPeriod, endTime=None,
+        initialTime=0, seed=None, environment=None, processes=None):
+    """
+    Simulate IMUs following independent trajectories in parallel.
+
+    Each IMU is simulated on its own in a separate L{Simulation}, with the
+    simulations divided between a pool of worker processes. This is only
+    valid for IMUs that do not interact, e.g. through their radios.
+
+    The random number generator of each simulation is obtained from
+    L{Simulation.subrng} of a master simulation, in trajectory order, so the
+    results depend only on the seed and not on the number of processes or
+    on how the IMUs are divided between them. If the IMU class accepts an
+    rng argument, as L{Orient3IMU} does, a generator obtained from the same
+    simulation is passed so that its imperfections are also reproducible.
+
+    IMUs that can be sampled with L{sampleIMU} are sampled in a single
+    vectorised step. Others are sampled by a L{BasicIMUBehaviour} in the
+    event driven simulation.
+
+    @param imuClass: L{IMU} subclass to simulate. It will be constructed
+        with a simulation and trajectory as arguments, and must be
+        importable by the worker processes.
+    @param trajectories: Sequence of trajectories for the IMUs to follow.
+        These must be picklable.
+    @param samplingPeriod: Interval at which to sample (float).
+    @param endTime: Simulation time up to which to sample (float). If None,
+        each IMU is simulated to the end of its trajectory.
+    @param initialTime: Initial time for local timekeeping.
+    @param seed: Seed value for the master random number generator.
+    @param environment: L{Environment} to simulate in.
+    @param processes: Number of worker processes to use. If None, one per
+        CPU is used. If 1, the IMUs are simulated in the current process.
+
+    @return: List of raw measurements for each trajectory. Each entry is a
+        list of L{TimeSeries}, one for each sensor of the IMU in the order
+        given by L{IMU.sensors}.
+    """
+    master = Simulation(seed=seed)
+    jobs = [(imuClass, trajectory, samplingPeriod, endTime, initialTime,
+        master.subrng(), environment) for trajectory in trajectories]
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(jobs))
+
+    if processes <= 1:
+        return map(_simulateIMU, jobs)
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_simulateIMU, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+def _simulateIMU(job):
+    """
+    Simulate a single IMU in a worker process.
+    """
+    imuClass, trajectory, samplingPeriod, endTime, initialTime, rng, \
+            environment = job
+    if endTime is None:
+        endTime = trajectory.endTime
+    sim = Simulation(environment=environment)
+    sim.rng = rng
+    if 'rng' in inspect.getargspec(imuClass.__init__).args:
+        imu = imuClass(sim, trajectory, rng=sim.subrng())
+    else:
+        imu = imuClass(sim, trajectory)
+    sim.time = trajectory.startTime
+    if canSampleIMU(imu):
+        sampleIMU(imu, samplingPeriod, endTime, initialTime)
+    else:
+        BasicIMUBehaviour(imu, samplingPeriod, initialTime=initialTime)
+        sim.run(endTime, printProgress=False)
+    return [sensor.rawMeasurements for sensor in imu.sensors]
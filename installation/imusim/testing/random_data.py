@@ -23,6 +23,8 @@ from imusim.maths.quaternions import QuaternionArray, QuaternionFromEuler
 from imusim.trajectories.sampled import SampledTrajectory
 from imusim.trajectories.splined import SplinedRotationTrajectory
 from imusim.trajectories.splined import SplinedTrajectory
+from imusim.trajectories.rigid_body import SampledBodyModel, SampledJoint
+from imusim.trajectories.rigid_body import PointTrajectory, SplinedBodyModel
 from imusim.utilities.time_series import TimeSeries
 
 rng = np.random.RandomState(42)
@@ -93,7 +95,7 @@ def randomValidity(t):
     valid = (rng.uniform(0,1) > 0.5)
     i = 0
     while i < len(t):
-        length = rng.uniform(1, 10)
+        length = int(rng.uniform(1, 10))
         validity[i:min(i+length,len(validity))] = valid
         valid = ~valid
         i += length
@@ -107,6 +109,29 @@ def invalidate(data, validity):
     np.atleast_2d(result)[:,~validity] = np.nan
     return result
 
+def randomBodyModel(t, depth=3):
+    """
+    A random splined body model with keyframes at given times.
+
+    Every joint has two children, down to the given depth, where the
+    children are points rather than joints.
+    """
+    model = SampledBodyModel('root')
+    model.positionKeyFrames = TimeSeries(t, randomPositionSequence(t))
+    model.rotationKeyFrames = TimeSeries(t, randomRotationSequence(t))
+    def addChildren(joint, level):
+        for i in range(2):
+            name = '%s.%d' % (joint.name, i)
+            if level == depth:
+                PointTrajectory(joint, name, randomPosition())
+            else:
+                child = SampledJoint(joint, name, randomPosition())
+                child.rotationKeyFrames = TimeSeries(t,
+                        randomRotationSequence(t))
+                addChildren(child, level + 1)
+    addChildren(model, 1)
+    return SplinedBodyModel(model)
+
 class RandomRotationTrajectory(SplinedRotationTrajectory):
     """
     A trajectory with a random curving path of rotation values.
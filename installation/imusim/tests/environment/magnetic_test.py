@@ -21,10 +21,13 @@ Tests for magnetic field environment.
 from imusim.environment.magnetic_fields import EarthMagneticField
 from imusim.environment.magnetic_fields import DistortedMagneticField
 from imusim.environment.magnetic_fields import SolenoidMagneticField
-from numpy.testing import assert_almost_equal
+from imusim.environment.magnetic_fields import _cel
+from numpy.testing import assert_almost_equal, assert_allclose
 from imusim.maths.vectors import vector
 from imusim.maths.transforms import AffineTransform
 from numpy import random
+from scipy.special import ellipk, ellipe
+import numpy as np
 
 # Tuple of constructor args and nominal field vectors for Earth fields
 TEST_PARAMS = [
@@ -66,5 +69,71 @@ def testDistortedField():
         yield checkNonZeroHeadingVariation, field, random.uniform(size=(3,1),
                 low=-1, high=1)
 
+def testEllipticIntegral():
+    kc = np.linspace(0.05, 1, 20)
+    m = 1 - kc**2
+    assert_almost_equal(_cel(kc, 1, 1, 1), ellipk(m))
+    assert_almost_equal(_cel(kc, 1, 1, kc**2), ellipe(m))
+    assert_almost_equal(_cel(kc[3], 1, 1, 1), ellipk(m[3]))
+    assert_almost_equal(_cel(kc.reshape(4,5), 1, 1, 1), ellipk(m).reshape(4,5))
+    assert np.isnan(_cel(0, 1, 1, 1))
 
+@np.vectorize
+def scalarCel(kc,p,c,s):
+    """
+    Reference scalar implementation of Bulirsch's algorithm for C(k_c,p,c,s).
+    """
+    ERRTOL = 1e-6
 
+    if kc == 0: return np.nan
+
+    k = np.abs(kc)
+    pp = p
+    cc = c
+    ss = s
+    em = 1
+    if p > 0:
+        pp = np.sqrt(p)
+        ss = s/pp
+    else:
+        f = kc**2
+        q = 1-f
+        g = 1-pp
+        f = f-pp
+        q = q*(ss-c*pp)
+        pp = np.sqrt(f/g)
+        cc = (c-ss)/g
+        ss = -q/(g**2 * pp) + cc*pp
+
+    f = cc
+    cc = cc + ss/pp
+    g = k/pp
+    ss = 2*(ss+f*g)
+    pp = g+pp
+    g = em
+    em = k+em
+    kk = k
+
+    while np.abs(g-k) > g*ERRTOL:
+        k = 2*np.sqrt(kk)
+        kk = k*em
+        f = cc
+        cc = cc + ss/pp
+        g = kk/pp
+        ss = 2*(ss + f*g)
+        pp = g+pp
+        g = em
+        em = k+em
+
+    return (np.pi/2)*(ss+cc*em)/(em*(em+pp))
+
+def testEllipticIntegralMatchesScalar():
+    random.seed(0)
+    kc = random.uniform(-1, 1, 1000)
+    p = random.uniform(-2, 2, 1000)
+    c = random.uniform(-2, 2, 1000)
+    s = random.uniform(-2, 2, 1000)
+    assert_allclose(_cel(kc, p, c, s), scalarCel(kc, p, c, s),
+            rtol=1e-12, atol=1e-12)
+    assert_allclose(_cel(kc, p[0], c[0], s[0]), scalarCel(kc, p[0], c[0], s[0]),
+            rtol=1e-12, atol=1e-12)
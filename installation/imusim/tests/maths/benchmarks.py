@@ -0,0 +1,131 @@
+"""
+Benchmarks for the vectorised maths implementations.
+
+Run with C{python -m imusim.tests.maths.benchmarks}. Where the compiled
+extension modules that the NumPy implementations replaced can be loaded on
+this platform, they are timed alongside for comparison.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+import imp
+import os
+import timeit
+from imusim.maths import quaternions
+from imusim.maths import quat_splines
+
+SIZES = [10**3, 10**4, 10**5, 10**6]
+
+def compiledModule(name):
+    """
+    Load the compiled extension module replaced by a NumPy implementation.
+
+    @param name: Name of the module in L{imusim.maths}.
+    @return: The compiled module, or None if it is not available or cannot
+        be loaded on this platform.
+    """
+    path = os.path.join(os.path.dirname(quaternions.__file__), name + '.pyd')
+    if not os.path.exists(path):
+        return None
+    try:
+        return imp.load_dynamic(name, path)
+    except ImportError:
+        return None
+
+def timeCall(func, repeat=3):
+    """
+    Return the best time in seconds of several calls to a function.
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def quaternionOperations(module, n):
+    """
+    Return named benchmark functions for quaternion array operations.
+    """
+    rng = np.random.RandomState(0)
+    data = rng.normal(size=(n,4))
+    data /= np.sqrt(np.sum(data**2, axis=1))[:,np.newaxis]
+    p = module.QuaternionArray(data)
+    q = module.QuaternionArray(data[::-1].copy())
+    v = rng.normal(size=(3,n))
+    return [
+        ('product', lambda: p * q),
+        ('conjugate', lambda: p.conjugate),
+        ('rotateVector', lambda: p.rotateVector(v)),
+        ('rotateFrame', lambda: p.rotateFrame(v)),
+        ('power', lambda: p ** 0.5),
+        ('unflipped', lambda: p.unflipped()),
+        ]
+
+def benchmarkQuaternions(sizes=SIZES):
+    """
+    Print timings of quaternion array operations for each array size.
+    """
+    implementations = [('numpy', quaternions)]
+    compiled = compiledModule('quaternions')
+    if compiled is not None:
+        implementations.append(('compiled', compiled))
+
+    print "Best time in ms for N quaternions"
+    print "%-14s %-9s" % ("operation", "impl") \
+        + "".join(" %10d" % n for n in sizes)
+    for name, module in implementations:
+        results = {}
+        for n in sizes:
+            operations = quaternionOperations(module, n)
+            for op, func in operations:
+                results.setdefault(op, []).append(timeCall(func) * 1000)
+        for op, _ in operations:
+            print "%-14s %-9s" % (op, name) \
+                + "".join(" %10.3f" % t for t in results[op])
+
+def benchmarkQuaternionSplines(sizes=SIZES, keyframes=1000):
+    """
+    Print evaluation throughput of quaternion B-splines for each number of
+    evaluation points.
+    """
+    implementations = [('numpy', quat_splines, quaternions)]
+    compiled = compiledModule('quat_splines')
+    if compiled is not None:
+        implementations.append(('compiled', compiled,
+            compiledModule('quaternions')))
+
+    rng = np.random.RandomState(0)
+    t = np.arange(keyframes) / 100
+    angles = np.cumsum(rng.normal(0, 0.05, (keyframes,3)), axis=0)
+
+    print "Evaluation of a %d keyframe quaternion B-spline" % keyframes
+    print "%-14s %-9s" % ("points/s", "impl") \
+        + "".join(" %10d" % n for n in sizes)
+    for name, splineModule, quaternionModule in implementations:
+        keyFrames = quaternionModule.QuaternionArray([
+            quaternionModule.QuaternionFromEuler(a, inDegrees=False)
+            for a in angles]).unflipped()
+        spline = splineModule.QuaternionBSpline(t, keyFrames)
+        rates = []
+        for n in sizes:
+            ts = np.linspace(spline.validFrom, spline.validTo, n)
+            rates.append(n / timeCall(lambda: spline(ts)))
+        print "%-14s %-9s" % ("", name) \
+            + "".join(" %10.3g" % r for r in rates)
+
+if __name__ == '__main__':
+    benchmarkQuaternions()
+    print
+    benchmarkQuaternionSplines()
@@ -0,0 +1,56 @@
+"""
+Tests for counter based random number generation.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+from numpy import testing
+from imusim.maths.counter_rng import CounterRNG
+
+def testReferenceValues():
+    # With a zero offset the stream is that of SplitMix64 seeded with zero.
+    rng = CounterRNG(0)
+    rng._offset = np.zeros(1, dtype=np.uint64)
+    testing.assert_equal(rng.integers([0, 1, 2]), np.array([0xe220a8397b1dcdaf,
+        0x6e789e6aa1b965f4, 0x06c45d188009454f], dtype=np.uint64))
+
+def testBlocks():
+    rng = CounterRNG(1234)
+    values = rng.normal(np.arange(1000))
+    testing.assert_equal(np.hstack([rng.normal(block)
+        for block in np.array_split(np.arange(1000), 7)]), values)
+    order = np.random.RandomState(0).permutation(1000)
+    testing.assert_equal(rng.normal(order), values[order])
+    testing.assert_equal(rng.normal(np.arange(1000).reshape(10,100)),
+            values.reshape(10,100))
+
+def testKeys():
+    a = CounterRNG(1).uniform(np.arange(100))
+    b = CounterRNG(2).uniform(np.arange(100))
+    assert not np.any(a == b)
+    testing.assert_equal(CounterRNG(1).uniform(np.arange(100)), a)
+
+def testDistributions():
+    rng = CounterRNG(42)
+    uniform = rng.uniform(np.arange(100000))
+    assert np.all((uniform > 0) & (uniform < 1))
+    testing.assert_almost_equal(np.mean(uniform), 0.5, 2)
+    normal = rng.normal(np.arange(100000), loc=3, scale=2)
+    testing.assert_almost_equal(np.mean(normal), 3, 1)
+    testing.assert_almost_equal(np.std(normal), 2, 1)
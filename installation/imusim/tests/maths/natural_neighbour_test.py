@@ -0,0 +1,87 @@
+"""
+Tests for natural neighbour interpolation.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+from numpy import testing
+from imusim.maths.natural_neighbour import NaturalNeighbourInterpolator
+from imusim.maths.vector_fields import NaturalNeighbourInterpolatedField
+
+rng = np.random.RandomState(0)
+
+def linearField(positions):
+    transform = np.array([[1,2,-1],[0.5,-3,2],[-2,1,0.25]])
+    return np.dot(transform, positions) + np.array([[1],[-2],[3]])
+
+def checkLinearPrecision(positions, queries, decimal):
+    interpolator = NaturalNeighbourInterpolator(
+        *np.vstack((positions, linearField(positions))))
+    testing.assert_almost_equal(interpolator(*queries),
+        linearField(queries), decimal)
+
+def testLinearPrecision():
+    # Sibson interpolation reproduces linear functions exactly away from the
+    # zero valued enclosing box.
+    yield checkLinearPrecision, rng.uniform(-1, 1, (3,400)), \
+        rng.uniform(-0.5, 0.5, (3,100)), 6
+    grid = np.mgrid[0:6,0:6,0:6].reshape(3,-1).astype(float)
+    yield checkLinearPrecision, grid, rng.uniform(2, 3, (3,100)), 6
+    yield checkLinearPrecision, grid, np.array([[2.5,2,3],[2,2.5,3],[3,3,2]]), 6
+
+def testSampleReproduction():
+    positions = rng.uniform(-1, 1, (3,50))
+    values = rng.normal(size=(3,50))
+    interpolator = NaturalNeighbourInterpolator(*np.vstack((positions, values)))
+    testing.assert_almost_equal(interpolator(*positions), values)
+
+def testOutsideBox():
+    positions = rng.uniform(-1, 1, (3,50))
+    values = rng.normal(size=(3,50))
+    interpolator = NaturalNeighbourInterpolator(*np.vstack((positions, values)))
+    assert np.all(np.isnan(interpolator(100, 0, 0)))
+    result = interpolator(3, 0, 0)
+    assert np.all(np.isfinite(result))
+    assert np.all(np.abs(result) < np.max(np.abs(values)))
+
+def testInterpolatedField():
+    positions = rng.uniform(-1, 1, (3,200))
+    values = linearField(positions)
+    values[:,0] = np.nan
+    field = NaturalNeighbourInterpolatedField(positions, values)
+    queries = rng.uniform(-0.5, 0.5, (3,20))
+    queries[:,1] = np.nan
+    result = field(queries, 0)
+    testing.assert_almost_equal(result[:,[0] + range(2,20)],
+        linearField(queries)[:,[0] + range(2,20)])
+    assert np.all(np.isnan(result[:,1]))
+
+def testBlocks():
+    # Positions interpolated together must not affect each other.
+    positions = rng.uniform(-1, 1, (3,100))
+    values = rng.normal(size=(3,100))
+    interpolator = NaturalNeighbourInterpolator(*np.vstack((positions, values)))
+    queries = rng.uniform(-1.5, 1.5, (3,50))
+    queries[:,10] = positions[:,3]
+    result = interpolator(*queries)
+    interpolator.BLOCK_SIZE = 7
+    testing.assert_almost_equal(interpolator(*queries), result, 12)
+    for i in range(50):
+        testing.assert_almost_equal(interpolator(*queries[:,i]), result[:,[i]],
+            12)
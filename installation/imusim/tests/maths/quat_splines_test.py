@@ -54,3 +54,23 @@ def testQuaternionBSpline():
         validity = randomValidity(t)
         qb = invalidate(qa, validity)
         yield checkQuaternionSpline, PartialInputQuaternionBSpline, t, qb
+
+def testQuaternionBSplineDerivatives():
+    t,qa = geodesicQuaternionPath()
+    spline = QuaternionBSpline(t, qa)
+    ts = np.linspace(spline.validFrom, spline.validTo, 50)[1:-1]
+    q, omega, alpha = spline(ts)
+    dt = 1e-6
+    qNext, omegaNext, _ = spline(ts + dt)
+    qPrev, omegaPrev, _ = spline(ts - dt)
+    qdot = (qNext - qPrev) / (2 * dt)
+    np.testing.assert_almost_equal(omega, (2 * q.conjugate * qdot).vector)
+    np.testing.assert_almost_equal(alpha,
+        (omegaNext - omegaPrev) / (2 * dt), decimal=5)
+
+def testQuaternionBSplineScalar():
+    t,qa = geodesicQuaternionPath()
+    spline = QuaternionBSpline(t, qa)
+    q, omega, alpha = spline(t[5])
+    assertQuaternionAlmostEqual(q, qa[5])
+    assert omega.shape == alpha.shape == (3,1)
@@ -0,0 +1,191 @@
+"""
+Tests for quaternion maths.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+import pickle
+from numpy import testing
+from nose.tools import raises
+from imusim.maths.quaternions import Quaternion, QuaternionArray, slerp
+from imusim.maths.matrices import matrixFromEuler
+from imusim.maths import vectors
+from imusim.testing.quaternions import assertQuaternionAlmostEqual
+
+rng = np.random.RandomState(0)
+
+def randomQuaternions(n):
+    return QuaternionArray([Quaternion.fromEuler(a, inDegrees=False)
+        for a in rng.uniform(-np.pi, np.pi, (n,3))])
+
+def testProduct():
+    i = Quaternion(0,1,0,0)
+    j = Quaternion(0,0,1,0)
+    k = Quaternion(0,0,0,1)
+    assertQuaternionAlmostEqual(i*j, k)
+    assertQuaternionAlmostEqual(j*k, i)
+    assertQuaternionAlmostEqual(k*i, j)
+    assertQuaternionAlmostEqual(i*i, Quaternion(-1,0,0,0))
+
+def testArrayProductMatchesScalar():
+    p = randomQuaternions(10)
+    q = randomQuaternions(10)
+    pq = p * q
+    for i in range(10):
+        assertQuaternionAlmostEqual(pq[i], p[i] * q[i])
+        assertQuaternionAlmostEqual((p[0] * q)[i], p[0] * q[i])
+        assertQuaternionAlmostEqual((p * q[0])[i], p[i] * q[0])
+
+def testScalarProduct():
+    q = Quaternion(1,2,3,4)
+    for scale in (2, 2.0, np.float64(2)):
+        testing.assert_equal((q * scale).components, (2,4,6,8))
+        testing.assert_equal((scale * q).components, (2,4,6,8))
+    qa = QuaternionArray([q, q])
+    testing.assert_equal((np.float64(2) * qa).array, [(2,4,6,8)]*2)
+    testing.assert_equal((qa / 2).array, [(0.5,1,1.5,2)]*2)
+
+def testConjugate():
+    q = randomQuaternions(5)
+    assertQuaternionAlmostEqual(q * q.conjugate,
+        QuaternionArray([Quaternion()]*5))
+
+def checkRotation(q, v):
+    expected = np.hstack([(q * Quaternion(0, *vi) * q.conjugate).vector
+        for vi in v.T])
+    testing.assert_almost_equal(q.rotateVector(v), expected)
+    testing.assert_almost_equal(q.rotateFrame(q.rotateVector(v)), v)
+
+def testRotateVector():
+    v = rng.normal(size=(3,5))
+    for q in randomQuaternions(5):
+        yield checkRotation, q, v
+
+def testArrayRotateVector():
+    q = randomQuaternions(20)
+    v = rng.normal(size=(3,20))
+    expected = np.hstack([qi.rotateVector(v[:,i:i+1])
+        for i, qi in enumerate(q)])
+    testing.assert_almost_equal(q.rotateVector(v), expected)
+    testing.assert_almost_equal(q.rotateFrame(q.rotateVector(v)), v)
+
+def testRotateVectorBroadcast():
+    q = randomQuaternions(4)
+    v = vectors.vector(1,2,3)
+    testing.assert_almost_equal(q.rotateVector(v),
+        q.rotateVector(np.tile(v, 4)))
+
+def checkEuler(angles, order):
+    q = Quaternion.fromEuler(angles, order)
+    testing.assert_almost_equal(q.toMatrix(), matrixFromEuler(angles, order))
+    testing.assert_almost_equal(q.toEuler(order), angles)
+
+def testEuler():
+    for angles in [(0,0,0), (30,20,10), (-120,45,170), (90,-60,-15)]:
+        for order in ['zyx', 'zxy']:
+            yield checkEuler, angles, order
+
+def testMatrixRoundTrip():
+    for q in randomQuaternions(20):
+        assertQuaternionAlmostEqual(Quaternion.fromMatrix(q.toMatrix()), q)
+
+def testFromVectors():
+    for q in randomQuaternions(5):
+        x, y, z = [q.rotateFrame(e) for e in np.eye(3)[:,:,np.newaxis]]
+        assertQuaternionAlmostEqual(Quaternion.fromVectors(x, y, z), q)
+
+def testAxisAngle():
+    q = Quaternion.fromAxisAngle(vectors.vector(0,0,2), np.pi/2)
+    axis, angle = q.toAxisAngle()
+    testing.assert_almost_equal(axis, vectors.vector(0,0,1))
+    testing.assert_almost_equal(angle, np.pi/2)
+    axes, angles = QuaternionArray([q, Quaternion()]).toAxisAngle()
+    testing.assert_almost_equal(axes, [[0,1],[0,0],[1,0]])
+    testing.assert_almost_equal(angles, [np.pi/2, 0])
+
+def testPower():
+    q = Quaternion.fromEuler((45,0,0))
+    assertQuaternionAlmostEqual(q**2, q*q)
+    assertQuaternionAlmostEqual(q**0.5 * q**0.5, q)
+    qa = QuaternionArray([q, q.conjugate])
+    assertQuaternionAlmostEqual(qa**0.5,
+        QuaternionArray([q**0.5, q.conjugate**0.5]))
+
+def testLogExp():
+    q = randomQuaternions(10)
+    assertQuaternionAlmostEqual(q.log().exp(), q)
+    assertQuaternionAlmostEqual(q[3].log().exp(), q[3])
+    assertQuaternionAlmostEqual(q.log()[3], q[3].log())
+
+def testSlerp():
+    q1 = Quaternion.fromEuler((10,20,30))
+    q2 = Quaternion.fromEuler((50,-20,60))
+    assertQuaternionAlmostEqual(slerp(q1, q2, 0), q1)
+    assertQuaternionAlmostEqual(slerp(q1, q2, 1), q2)
+    halfway = q1 * (q1.conjugate * q2)**0.5
+    assertQuaternionAlmostEqual(slerp(q1, q2, 0.5), halfway)
+    assertQuaternionAlmostEqual(slerp(q1, -q2, 0.5), halfway)
+    result = slerp(q1, q2, [0, 0.5, 1])
+    assert isinstance(result, QuaternionArray)
+    assertQuaternionAlmostEqual(result,
+        QuaternionArray([q1, halfway, q2]))
+    assertQuaternionAlmostEqual(slerp(q1, q1, 0.5), q1)
+
+def testArrayConstruction():
+    q = randomQuaternions(5)
+    for data in [list(q), (q.w, q.x, q.y, q.z), q.array, q]:
+        testing.assert_equal(QuaternionArray(data).array, q.array)
+    assert QuaternionArray(q.array, copy=False).array is q.array
+
+@raises(ValueError)
+def testInvalidArrayShape():
+    QuaternionArray(np.zeros((3,3)))
+
+@raises(TypeError)
+def testInvalidArrayType():
+    QuaternionArray(1)
+
+def testIndexing():
+    q = randomQuaternions(5)
+    assert isinstance(q[2], Quaternion)
+    assert isinstance(q[1:3], QuaternionArray)
+    assert len(q[1:3]) == 2
+    q[0] = Quaternion()
+    testing.assert_equal(q.array[0], (1,0,0,0))
+
+def testUnflipped():
+    step = Quaternion.fromEuler((30,0,0))
+    q = QuaternionArray([step**t for t in range(6)])
+    flipped = q.copy()
+    flipped.array[2:4] *= -1
+    flipped.array[1] = np.nan
+    unflipped = flipped.unflipped()
+    valid = [0,2,3,4,5]
+    testing.assert_almost_equal(unflipped.array[valid], q.array[valid])
+    assert not unflipped.validity()[1]
+
+def testNaN():
+    assert not np.any(QuaternionArray.nan(3).validity())
+    assert np.isnan(Quaternion.nan().w)
+
+def testPickle():
+    q = Quaternion(1,2,3,4)
+    assert pickle.loads(pickle.dumps(q)) == q
+    qa = randomQuaternions(3)
+    assert pickle.loads(pickle.dumps(qa)) == qa
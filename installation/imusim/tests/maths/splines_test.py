@@ -19,11 +19,17 @@ Tests for scalar splines.
 # along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
 
 from imusim.maths.splines import Spline, UnivariateSpline, PartialInputSpline
+from imusim.maths.splines import SplineFitter
 from imusim.testing.random_data import randomValidity, invalidate
 from nose.tools import raises
 from numpy.testing import assert_almost_equal
 from numpy import random
 import numpy as np
+import multiprocessing
+import os
+import shutil
+import tempfile
+from multiprocessing.pool import ThreadPool
 
 @raises(Spline.InsufficientPointsError)
 def testInsufficientPointsError():
@@ -58,6 +64,24 @@ def testPartialInterpolatingSpline():
     assert_almost_equal(spline(x, 1)[valid], yp[valid])
     assert_almost_equal(spline(x, 2)[valid], ypp[valid])
 
+def testManyRegions():
+    x = np.linspace(0, 100, 5000)
+    y = np.sin(x)
+    y[np.random.RandomState(0).uniform(size=5000) < 0.02] = np.nan
+    spline = PartialInputSpline(x, y, order=3)
+    assert len(spline.splines) > 50
+    queries = np.random.RandomState(1).uniform(-1, 101, 2000)
+    queries[0] = np.nan
+    expected = np.empty_like(queries)
+    expected.fill(np.nan)
+    with np.errstate(invalid='ignore'):
+        for start, end, s in spline.regions:
+            inside = (queries >= start) & (queries <= end)
+            if np.any(inside):
+                expected[inside] = s(queries[inside], 1)
+    assert_almost_equal(spline(queries, 1), expected)
+    assert_almost_equal(spline(queries[5], 1), expected[5])
+
 def testSmootingSpline():
     x = np.linspace(-10,10,1000)
     y = x**3
@@ -69,5 +93,64 @@ def testSmootingSpline():
     s = (x>spline.validFrom) & (x < spline.validTo)
     assert_almost_equal(spline(x)[s], y[s], 1)
 
+def fitCubic(x, stddev):
+    return UnivariateSpline(x, x**3, stddev=stddev)
+
+def checkFitter(pool):
+    fitter = SplineFitter(pool)
+    data = [np.linspace(0, i, 20 + i) for i in range(1, 6)]
+    for x in data:
+        fitter.submit(fitCubic, x, 0.1)
+    splines = [fitter.fit(fitCubic, x, 0.1) for x in reversed(data)]
+    splines.reverse()
+    for x, spline in zip(data, splines):
+        assert_almost_equal(spline(x), fitCubic(x, 0.1)(x))
+    assert [t.points for t in fitter.timings] == [len(x) for x in reversed(data)]
+    assert all(t.function == 'fitCubic' and t.duration >= 0
+            for t in fitter.timings)
+
+def testFitter():
+    yield checkFitter, None
+    pool = ThreadPool(2)
+    yield checkFitter, pool
+    pool.close()
+    pool = multiprocessing.Pool(2)
+    yield checkFitter, pool
+    pool.close()
+
+@raises(Spline.InsufficientPointsError)
+def testFitterInsufficientPoints():
+    pool = multiprocessing.Pool(1)
+    try:
+        fitter = SplineFitter(pool)
+        x = np.arange(3.0)
+        fitter.submit(fitCubic, x, 0)
+        fitter.fit(fitCubic, x, 0)
+    finally:
+        pool.close()
 
+def testFitterCache():
+    directory = tempfile.mkdtemp()
+    try:
+        x = np.linspace(0, 1, 50)
+        fitter = SplineFitter(cacheDirectory=directory)
+        spline = fitter.fit(fitCubic, x, 0.1)
+        cached = SplineFitter(cacheDirectory=directory)
+        assert_almost_equal(cached.fit(fitCubic, x.copy(), 0.1)(x), spline(x))
+        cached.fit(fitCubic, x, 0.2)
+        cached.fit(fitCubic, x + 1, 0.1)
+        assert [t.cached for t in cached.timings] == [True, False, False]
+        assert len(os.listdir(directory)) == 3
 
+        # Damaged cache files are fitted again.
+        for name, content in zip(sorted(os.listdir(directory)),
+                ['', 'garbage', 'cno_such_module\nfunction\n.']):
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(content)
+        cached.fit(fitCubic, x, 0.1)
+        cached.fit(fitCubic, x, 0.2)
+        cached.fit(fitCubic, x + 1, 0.1)
+        assert not any(t.cached for t in cached.timings[-3:])
+        assert len(os.listdir(directory)) == 3
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,120 @@
+"""
+Tests for vector fields.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+import os
+import shutil
+import tempfile
+from numpy import testing
+from nose.tools import raises
+from imusim.maths import vectors
+from imusim.maths.vector_fields import VectorField, GridCachedField
+from imusim.environment.magnetic_fields import SolenoidMagneticField
+from imusim.maths.transforms import AffineTransform
+
+rng = np.random.RandomState(0)
+
+class PolynomialField(VectorField):
+    def __init__(self, degree):
+        self.degree = degree
+        self.evaluations = 0
+
+    def __call__(self, position, t):
+        self.evaluations += np.shape(position)[1]
+        x, y, z = position
+        return np.vstack((x**self.degree, x*y*z, y - z**self.degree))
+
+    @property
+    def nominalValue(self):
+        return np.zeros((3,1))
+
+def checkExactInterpolation(order):
+    # Trilinear interpolation is exact for multilinear fields, and tricubic
+    # interpolation for fields of up to cubic degree in each co-ordinate.
+    field = PolynomialField(order)
+    cached = GridCachedField(field, (-1,-2,0), (1,0,1), 0.25, order=order)
+    positions = rng.uniform((-1,-2,0), (1,0,1), (20,3)).T
+    evaluations = field.evaluations
+    testing.assert_almost_equal(cached(positions, 0), field(positions, 0))
+    assert field.evaluations == evaluations + 20
+
+def testExactInterpolation():
+    for order in (1, 3):
+        yield checkExactInterpolation, order
+
+def testOutsideRegion():
+    field = PolynomialField(2)
+    cached = GridCachedField(field, (0,0,0), (1,1,1), 0.5)
+    positions = np.array([[0.5,2,np.nan],[0.5,0,0],[0.5,0,0]])
+    result = cached(positions, 0)
+    testing.assert_almost_equal(result[:,1], field(positions[:,1:2], 0)[:,0])
+    assert np.all(np.isnan(result[:,2]))
+    testing.assert_equal(cached.upper, [[1],[1],[1]])
+
+def checkTolerance(order):
+    field = SolenoidMagneticField(200, 20, 0.05, 0.2, AffineTransform())
+    tolerance = 1e-9
+    cached = GridCachedField(field, (0.3,0.3,0.3), (0.6,0.6,0.6), 0.1,
+            order=order, tolerance=tolerance)
+    assert cached.error <= tolerance
+    assert np.all(cached.spacing < 0.1)
+    positions = rng.uniform(0.3, 0.6, (3,1000))
+    errors = vectors.norm(cached(positions, 0) - field(positions, 0))
+    assert np.max(errors) < 2 * tolerance
+
+def testTolerance():
+    for order in (1, 3):
+        yield checkTolerance, order
+
+@raises(ValueError)
+def testTooManyPoints():
+    field = SolenoidMagneticField(200, 20, 0.05, 0.2, AffineTransform())
+    GridCachedField(field, (0,0,0), (1,1,1), 0.5, tolerance=1e-15,
+            maxPoints=1000)
+
+def testPersistence():
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'field.npz')
+        field = PolynomialField(3)
+        cached = GridCachedField(field, (0,0,0), (1,1,1), 0.5, order=3,
+                tolerance=0.1, filename=filename)
+        assert os.path.exists(filename)
+        field.evaluations = 0
+        loaded = GridCachedField(field, (0,0,0), (1,1,1), 0.5, order=3,
+                tolerance=0.1, filename=filename)
+        assert field.evaluations == 8
+        testing.assert_equal(loaded.spacing, cached.spacing)
+        assert loaded.error == cached.error
+        positions = rng.uniform(0, 1, (3,10))
+        testing.assert_equal(loaded(positions, 0), cached(positions, 0))
+
+        # A changed field or region must not use the saved values.
+        changed = PolynomialField(2)
+        GridCachedField(changed, (0,0,0), (1,1,1), 0.5, order=3,
+                tolerance=0.1, filename=filename)
+        assert changed.evaluations > 8
+        field.evaluations = 0
+        GridCachedField(field, (0,0,0), (2,1,1), 0.5, order=3,
+                tolerance=0.1, filename=filename)
+        assert field.evaluations > 8
+    finally:
+        shutil.rmtree(directory)
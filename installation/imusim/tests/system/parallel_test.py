@@ -0,0 +1,52 @@
+"""
+Test parallel simulation of independent IMUs.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+from imusim.simulation.parallel import simulateIMUs
+from imusim.platforms.imus import IdealIMU, Orient3IMU
+from imusim.testing.random_data import RandomTrajectory
+from imusim.tests.system.sampling_test import NoisyQuantisingIMU
+from numpy.testing import assert_equal
+import numpy as np
+
+def checkParallel(imuClass):
+    trajectories = [RandomTrajectory() for i in range(3)]
+    period = 1/50
+    results = [simulateIMUs(imuClass, trajectories, period, seed=1,
+        processes=processes) for processes in (1, 2)]
+    for serial, parallel in zip(*results):
+        assert len(serial) == len(parallel) == 3
+        for expected, actual in zip(serial, parallel):
+            assert len(actual) > 0
+            assert_equal(actual.timestamps, expected.timestamps)
+            assert_equal(actual.values, expected.values)
+
+def testParallel():
+    for imuClass in (IdealIMU, NoisyQuantisingIMU, Orient3IMU):
+        yield checkParallel, imuClass
+
+def testSeeds():
+    trajectories = [RandomTrajectory()] * 2
+    results = [simulateIMUs(NoisyQuantisingIMU, trajectories, 1/50, seed=seed,
+        processes=1) for seed in (1, 1, 2)]
+    accelerometer = [[imu[0].values for imu in result] for result in results]
+    assert_equal(accelerometer[0], accelerometer[1])
+    assert not np.array_equal(accelerometer[0][0], accelerometer[0][1])
+    assert not np.array_equal(accelerometer[0][0], accelerometer[2][0])
@@ -0,0 +1,112 @@
+"""
+Test vectorised IMU sampling against event driven simulation.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+from imusim.simulation.base import Simulation
+from imusim.platforms.imus import StandardIMU, IdealIMU, Orient3IMU
+from imusim.platforms.accelerometers import NoisyAccelerometer
+from imusim.platforms.magnetometers import NoisyMagnetometer
+from imusim.platforms.gyroscopes import NoisyGyroscope
+from imusim.platforms.adcs import QuantisingADC
+from imusim.platforms.timers import IdealTimer
+from imusim.platforms.radios import IdealRadio
+from imusim.behaviours.imu import BasicIMUBehaviour, sampleIMU
+from imusim.testing.random_data import RandomTrajectory
+from numpy.testing import assert_equal, assert_array_almost_equal
+import numpy as np
+from nose.tools import raises
+
+class NoisyQuantisingIMU(StandardIMU):
+    def __init__(self, simulation=None, trajectory=None):
+        self.accelerometer = NoisyAccelerometer(self, noiseStdDev=0.1)
+        self.magnetometer = NoisyMagnetometer(self, noiseStdDev=1e-6)
+        self.gyroscope = NoisyGyroscope(self, noiseStdDev=0.01)
+        self.adc = QuantisingADC(self, bits=12, vref=100)
+        self.timer = IdealTimer(self)
+        self.radio = IdealRadio(self)
+        StandardIMU.__init__(self, simulation, trajectory)
+
+def checkSampling(imuClass, initialTime):
+    traj = RandomTrajectory()
+    period = 1/100
+    imus = []
+    for vectorised in (False, True):
+        sim = Simulation(seed=0)
+        imu = imuClass(sim, traj)
+        sim.time = traj.startTime
+        if vectorised:
+            sampleIMU(imu, period, traj.endTime, initialTime)
+        else:
+            BasicIMUBehaviour(imu, period, initialTime=initialTime)
+            sim.run(traj.endTime, printProgress=False)
+        imus.append(imu)
+
+    for expected, actual in zip(*[imu.sensors for imu in imus]):
+        assert_equal(actual.rawMeasurements.timestamps,
+            expected.rawMeasurements.timestamps)
+        assert_array_almost_equal(actual.rawMeasurements.values,
+            expected.rawMeasurements.values, 10)
+
+def testSampleTimes():
+    traj = RandomTrajectory()
+    period = 1/100
+    times = []
+    for vectorised in (False, True):
+        sim = Simulation(seed=0)
+        imu = IdealIMU(sim, traj)
+        sim.time = traj.startTime
+        if vectorised:
+            voltages = imu.accelerometer.voltages
+            def recordTimes(t):
+                times.append(t)
+                return voltages(t)
+            imu.accelerometer.voltages = recordTimes
+            sampleIMU(imu, period, traj.endTime)
+        else:
+            eventTimes = []
+            BasicIMUBehaviour(imu, period,
+                sampleCallback=lambda behaviour: eventTimes.append(sim.time))
+            sim.run(traj.endTime, printProgress=False)
+            times.append(np.array(eventTimes))
+    assert_equal(times[1], times[0])
+
+def testSampling():
+    for imuClass in (IdealIMU, NoisyQuantisingIMU):
+        for initialTime in (0, 1.5):
+            yield checkSampling, imuClass, initialTime
+
+@raises(ValueError)
+def testUnsupportedTimer():
+    traj = RandomTrajectory()
+    sim = Simulation()
+    imu = Orient3IMU(sim, traj)
+    sim.time = traj.startTime
+    sampleIMU(imu, 1/100, traj.endTime)
+
+def testNoiseBlocks():
+    traj = RandomTrajectory()
+    sim = Simulation(seed=0)
+    imu = NoisyQuantisingIMU(sim, traj)
+    sensor = imu.accelerometer
+    t = np.linspace(traj.startTime, traj.endTime, 100)
+    noise = np.hstack([sensor.noiseVoltages(t[:40]),
+        sensor.noiseVoltages(t[40:41]), sensor.noiseVoltages(t[41:])])
+    assert_equal(sensor.sampleNoise(np.arange(100)), noise)
+    assert_equal(sensor.sampleNoise([70, 3]), noise[:,[70, 3]])
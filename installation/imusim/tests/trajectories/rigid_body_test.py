@@ -0,0 +1,61 @@
+"""
+Tests for rigid body model trajectories.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+from numpy.testing import assert_almost_equal
+from imusim.testing.random_data import randomTimeSequence
+from imusim.testing.random_data import randomBodyModel
+from imusim.testing.quaternions import assertQuaternionAlmostEqual
+from imusim.trajectories.rigid_body import evaluateKinematics
+
+def checkKinematics(model, t):
+    # Evaluate each point separately first, as the batched evaluation
+    # stores its results in the trajectory caches.
+    expected = dict((point, (point.position(t), point.velocity(t),
+        point.acceleration(t), point.rotation(t), point.rotationalVelocity(t),
+        point.rotationalAcceleration(t))) for point in model.points)
+    results = evaluateKinematics(model, t)
+    assert len(results) == len(expected)
+    for point, kinematics in results.items():
+        p, v, a, r, omega, alpha = expected[point]
+        assert_almost_equal(kinematics.position, p)
+        assert_almost_equal(kinematics.velocity, v)
+        assert_almost_equal(kinematics.acceleration, a, 5)
+        assertQuaternionAlmostEqual(kinematics.rotation, r)
+        assert_almost_equal(kinematics.rotationalVelocity, omega)
+        assert_almost_equal(kinematics.rotationalAcceleration, alpha)
+        cache = type(point).acceleration.cache
+        hits = cache.hits
+        assert_almost_equal(point.acceleration(t), kinematics.acceleration)
+        assert cache.hits == hits + 1
+
+def testKinematics():
+    model = randomBodyModel(randomTimeSequence())
+    t = np.linspace(model.startTime, model.endTime, 50)
+    yield checkKinematics, model, t
+    yield checkKinematics, model, t[10]
+
+def testKinematicsWithoutDerivatives():
+    model = randomBodyModel(randomTimeSequence(), depth=2)
+    t = np.linspace(model.startTime, model.endTime, 10)
+    for point, kinematics in evaluateKinematics(model, t, False).items():
+        assert kinematics.velocity is None
+        assert_almost_equal(kinematics.position, point.position(t))
@@ -20,9 +20,17 @@ Tests for splined trajectories.
 
 from imusim.trajectories.sampled import SampledTrajectory
 from imusim.trajectories.splined import SplinedTrajectory
+from imusim.trajectories.rigid_body import SplinedBodyModel
 from imusim.testing.random_data import randomTimeSequence, randomPositionSequence, randomRotationSequence
+from imusim.testing.random_data import randomBodyModel
 from imusim.testing.trajectories import checkTrajectory
 from imusim.utilities.time_series import TimeSeries
+from imusim.maths.splines import SplineFitter
+from multiprocessing.pool import ThreadPool
+from numpy.testing import assert_equal
+import numpy as np
+import shutil
+import tempfile
 
 def testSplineTrajectories():
     for i in range(100):
@@ -33,3 +41,54 @@ def testSplineTrajectories():
         yield checkTrajectory, T, p, r
         T = SplinedTrajectory(SampledTrajectory(p, r), smoothRotations=True)
         yield checkTrajectory, T, p, TimeSeries(t, r.values.smoothed())
+
+def testModifiedResults():
+    t = randomTimeSequence()
+    sampled = SampledTrajectory(TimeSeries(t, randomPositionSequence(t)),
+            TimeSeries(t, randomRotationSequence(t)))
+    T = SplinedTrajectory(sampled)
+    t = np.linspace(T.startTime, T.endTime, 20)
+    p = T.position(t).copy()
+    T.position(t)[:] = 0
+    assert_equal(T.position(t), p)
+    r = T.rotation(t).copy()
+    T.rotation(t).array[:] = 0
+    assert_equal(T.rotation(t).array, r.array)
+    r = T.rotation(t[5]).copy()
+    T.rotation(t[5]).negate()
+    assert T.rotation(t[5]) == r
+
+def testSplineFitterBodyModel():
+    sampled = randomBodyModel(randomTimeSequence()).sampled
+    pool = ThreadPool(2)
+    try:
+        fitter = SplineFitter(pool)
+        parallel = SplinedBodyModel(sampled, splineFitter=fitter)
+    finally:
+        pool.close()
+    serial = SplinedBodyModel(sampled)
+    assert len(fitter.timings) == 1 + len(list(sampled.joints))
+    t = np.linspace(serial.startTime, serial.endTime, 20)
+    for p, q in zip(serial.points, parallel.points):
+        assert p.name == q.name
+        assert_equal(q.position(t), p.position(t))
+        assert_equal(q.rotation(t).array, p.rotation(t).array)
+
+def testSplineCache():
+    t = randomTimeSequence()
+    sampled = SampledTrajectory(TimeSeries(t, randomPositionSequence(t)),
+            TimeSeries(t, randomRotationSequence(t)))
+    directory = tempfile.mkdtemp()
+    try:
+        trajectories = []
+        for i in range(2):
+            fitter = SplineFitter(cacheDirectory=directory)
+            trajectories.append(SplinedTrajectory(sampled,
+                splineFitter=fitter))
+        assert all(timing.cached for timing in fitter.timings)
+        fitted, loaded = trajectories
+        t = np.linspace(fitted.startTime, fitted.endTime, 20)
+        assert_equal(loaded.position(t), fitted.position(t))
+        assert_equal(loaded.rotation(t).array, fitted.rotation(t).array)
+    finally:
+        shutil.rmtree(directory)
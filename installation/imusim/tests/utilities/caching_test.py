@@ -0,0 +1,109 @@
+"""
+Tests for result caching decorators.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import gc
+import weakref
+from numpy import testing
+from nose.tools import raises
+from imusim.utilities.caching import CacheRecentValues, CacheLastValue
+
+class Counter(object):
+    def __init__(self):
+        self.calls = 0
+
+    @CacheRecentValues(maxEntries=2)
+    def value(self, t):
+        self.calls += 1
+        if np.any(np.isnan(t)):
+            raise ValueError
+        return np.asarray(t) * 2
+
+    @CacheLastValue()
+    def last(self, t):
+        self.calls += 1
+        return t
+
+def testAlternatingTimes():
+    obj = Counter()
+    for i in range(5):
+        obj.value(1.0)
+        obj.value(2.0)
+    assert obj.calls == 2
+    obj.value(3.0)
+    obj.value(1.0)
+    assert obj.calls == 4
+
+def testArrayTimes():
+    obj = Counter()
+    t = np.arange(5.0)
+    testing.assert_equal(obj.value(t), t * 2)
+    testing.assert_equal(obj.value(t + 1e-9), t * 2)
+    assert obj.calls == 1
+    t[0] = 10
+    testing.assert_equal(obj.value(t), t * 2)
+    obj.value(t[:3])
+    assert obj.calls == 3
+
+def testModifiedResults():
+    obj = Counter()
+    t = np.arange(5.0)
+    obj.value(t)[:] = 0
+    result = obj.value(t)
+    testing.assert_equal(result, t * 2)
+    result[:] = 0
+    testing.assert_equal(obj.value(t), t * 2)
+    assert obj.calls == 1
+
+def testSeparateObjects():
+    a = Counter()
+    b = Counter()
+    a.value(1.0)
+    b.value(1.0)
+    assert a.calls == 1 and b.calls == 1
+
+def testStatistics():
+    cache = Counter.value.cache
+    cache.clear()
+    obj = Counter()
+    obj.value(1.0)
+    obj.value(1.0)
+    obj.value(2.0)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def testLastValue():
+    obj = Counter()
+    obj.last(1.0)
+    obj.last(1.0)
+    obj.last(2.0)
+    obj.last(1.0)
+    assert obj.calls == 3
+
+@raises(ValueError)
+def testExceptionsPropagate():
+    Counter().value(np.nan)
+
+def testWeakReferences():
+    obj = Counter()
+    obj.value(1.0)
+    ref = weakref.ref(obj)
+    del obj
+    gc.collect()
+    assert ref() is None
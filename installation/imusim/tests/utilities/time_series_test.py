@@ -0,0 +1,131 @@
+"""
+Tests for time series data.
+"""
+# Copyright (C) 2009-2011 University of Edinburgh
+#
+# This file is part of IMUSim.
+#
+# IMUSim is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IMUSim is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+import pickle
+from numpy import testing
+from imusim.utilities.time_series import TimeSeries
+from imusim.maths.quaternions import Quaternion, QuaternionArray
+from imusim.testing.quaternions import assertQuaternionAlmostEqual
+from nose.tools import raises
+
+rng = np.random.RandomState(0)
+
+def testVectorConstruction():
+    t = np.arange(10) / 10
+    v = rng.normal(size=(3,10))
+    ts = TimeSeries(t, v)
+    assert ts.dtype is np.ndarray
+    assert len(ts) == 10
+    assert np.shares_memory(ts.values, v)
+    testing.assert_equal(ts.timestamps, t)
+    testing.assert_equal(ts.values, v)
+    testing.assert_equal(ts(0.25), v[:,2:3])
+    testing.assert_equal(ts.latestValue, v[:,-1:])
+
+def testScalarConstruction():
+    ts = TimeSeries([0, 1, 2], [3.0, 4.0, 5.0])
+    assert ts.dtype is np.float64
+    testing.assert_equal(ts.values, [3, 4, 5])
+    testing.assert_equal(ts([0.5, 2]), [3, 5])
+
+def testQuaternionConstruction():
+    q = QuaternionArray([Quaternion.fromEuler((i*10,0,0)) for i in range(5)])
+    for data in (q, list(q)):
+        ts = TimeSeries(np.arange(5), data)
+        assert ts.dtype is Quaternion
+        assertQuaternionAlmostEqual(ts.values, q)
+        assertQuaternionAlmostEqual(ts(3.5), q[3])
+
+def testAddMatchesConstruction():
+    t = np.arange(100) / 10
+    v = rng.normal(size=(3,100))
+    ts = TimeSeries()
+    for i in range(100):
+        ts.add(t[i], v[:,i:i+1])
+    testing.assert_equal(ts.timestamps, t)
+    testing.assert_equal(ts.values, v)
+    assert ts.dtype is np.ndarray
+
+def testAddAfterConstruction():
+    v = np.zeros((3,2))
+    ts = TimeSeries([0, 1], v)
+    ts.add(2, np.ones((3,1)))
+    testing.assert_equal(ts.values, [[0,0,1]]*3)
+    testing.assert_equal(v, np.zeros((3,2)))
+
+def testValuesView():
+    ts = TimeSeries()
+    ts.add(0, 1.0)
+    values = ts.values
+    ts.add(1, 2.0)
+    testing.assert_equal(values, [1])
+    testing.assert_equal(ts.values, [1, 2])
+
+def testVariances():
+    ts = TimeSeries()
+    ts.add(0, np.zeros((3,1)), np.eye(3))
+    ts.add(1, np.ones((3,1)), 2*np.eye(3))
+    value, variance = ts(1.5, returnVariance=True)
+    testing.assert_equal(value, np.ones((3,1)))
+    testing.assert_equal(variance, 2*np.eye(3))
+    assert np.all(np.isnan(TimeSeries([0], [1.0]).variances))
+
+def testPickle():
+    ts = TimeSeries(np.arange(4), rng.normal(size=(3,4)))
+    copy = pickle.loads(pickle.dumps(ts))
+    testing.assert_equal(copy.timestamps, ts.timestamps)
+    testing.assert_equal(copy.values, ts.values)
+
+def testLookupCursor():
+    t = np.cumsum(rng.uniform(0.1, 1, 200))
+    ts = TimeSeries(t, rng.normal(size=(3,200)))
+    sortedQueries = np.sort(rng.uniform(-1, t[-1] + 1, 1000))
+    randomQueries = rng.uniform(-1, t[-1] + 1, 100)
+    for queries in (sortedQueries, randomQueries):
+        expected = ts.values[:,np.searchsorted(t, queries, 'right') - 1]
+        testing.assert_equal(np.hstack([ts(q) for q in queries]), expected)
+        testing.assert_equal(np.hstack([ts(c)
+            for c in np.array_split(queries, 7)]), expected)
+
+def testLinearInterpolation():
+    ts = TimeSeries(np.arange(5), np.arange(15.0).reshape(3,5))
+    testing.assert_equal(ts.interpolate(2.5), [[2.5],[7.5],[12.5]])
+    result = ts.interpolate([0, 3.25, 4, 4.5, -1])
+    testing.assert_equal(result[:,:3], [[0,3.25,4],[5,8.25,9],[10,13.25,14]])
+    assert np.all(np.isnan(result[:,3:]))
+    scalars = TimeSeries([0, 1, 2], [0.0, 10.0, 20.0])
+    testing.assert_equal(scalars.interpolate(1.5), 15)
+    testing.assert_equal(scalars.interpolate([0.5, 2]), [5, 20])
+
+@raises(ValueError)
+def testEmptyInterpolation():
+    TimeSeries().interpolate(1)
+
+def testSlerpInterpolation():
+    q1 = Quaternion.fromEuler((10,0,0))
+    q2 = Quaternion.fromEuler((50,0,0))
+    ts = TimeSeries([0, 2], QuaternionArray([q1, q2]))
+    assertQuaternionAlmostEqual(ts.interpolate(1), Quaternion.fromEuler((30,0,0)))
+    result = ts.interpolate([0, 0.5, 2, 3])
+    assertQuaternionAlmostEqual(result[:3], QuaternionArray([q1,
+        Quaternion.fromEuler((20,0,0)), q2]))
+    assert not result.validity()[3]
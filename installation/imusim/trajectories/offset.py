@@ -22,7 +22,7 @@ import numpy as np
 from imusim.maths import vectors
 from imusim.trajectories.base import PositionTrajectory, RotationTrajectory
 from imusim.maths.quaternions import Quaternion
-from imusim.utilities.caching import CacheLastValue
+from imusim.utilities.caching import CacheRecentValues
 from imusim.utilities.documentation import prepend_method_doc
 
 class OffsetTrajectory(PositionTrajectory, RotationTrajectory):
@@ -55,13 +55,13 @@ class OffsetTrajectory(PositionTrajectory, RotationTrajectory):
         else:
             self.rotationOffset = rotationOffset
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def position(self, t):
         p = self.parent.position(t)
         r = self.parent.rotation(t)
         return p + r.rotateVector(self.positionOffset)
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def velocity(self, t):
         v = self.parent.velocity(t)
         r = self.parent.rotation(t)
@@ -70,7 +70,7 @@ class OffsetTrajectory(PositionTrajectory, RotationTrajectory):
         rv = vectors.cross(omega, o)
         return v + rv
 
-    @CacheLastValue()
+    @CacheRecentValues()
     @prepend_method_doc(PositionTrajectory)
     def acceleration(self, t):
         """
@@ -88,7 +88,7 @@ class OffsetTrajectory(PositionTrajectory, RotationTrajectory):
         lr = vectors.dot(o, omega) * omega - o * vectors.norm(omega)**2
         return a + lt + lr
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def rotation(self, t):
         return self.parent.rotation(t) * self.rotationOffset
 
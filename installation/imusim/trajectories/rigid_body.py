@@ -35,6 +35,8 @@ from imusim.trajectories.sampled import SampledRotationTrajectory
 from imusim.trajectories.splined import SplinedPositionTrajectory
 from imusim.trajectories.splined import SplinedRotationTrajectory
 from imusim.utilities.trees import TreeNode
+from imusim.maths import vectors
+from collections import namedtuple
 import numpy as np
 
 class Point(TreeNode):
@@ -286,7 +288,16 @@ class SplinedBodyModel(SplinedPositionTrajectory, SplinedJoint):
 
         @param sampled: The L{SampledBodyModel} from which to generated
             splined trajectories
+
+        Keyword arguments are passed to the L{SplinedPositionTrajectory} and
+        L{SplinedRotationTrajectory} constructors. If a L{SplineFitter} is
+        given, the splines of all joints are submitted to it together.
         """
+        fitter = kwargs.get('splineFitter')
+        if fitter is not None:
+            fitter.submit(*self._positionSplineFit(sampled, **kwargs))
+            for joint in sampled.joints:
+                fitter.submit(*self._rotationSplineFit(joint, **kwargs))
         SplinedJoint.__init__(self, None, sampled, **kwargs)
         SplinedPositionTrajectory.__init__(self, sampled, **kwargs)
 
@@ -297,3 +308,87 @@ class SplinedBodyModel(SplinedPositionTrajectory, SplinedJoint):
     @property
     def endTime(self):
         return min(self._positionEndTime, self._rotationEndTime)
+
+#: Position, rotation and their derivatives of a point at given time(s).
+PointKinematics = namedtuple('PointKinematics', ['position', 'velocity',
+    'acceleration', 'rotation', 'rotationalVelocity',
+    'rotationalAcceleration'])
+
+def _offsetMethod(point, name):
+    """
+    Whether a point obtains a trajectory method from L{OffsetTrajectory}.
+    """
+    return isinstance(point, OffsetTrajectory) and \
+        getattr(type(point), name).im_func is \
+            getattr(OffsetTrajectory, name).im_func
+
+def _storeResult(point, name, t, value):
+    """
+    Store a value in the result cache of a trajectory method, if it has one.
+    """
+    cache = getattr(getattr(type(point), name), 'cache', None)
+    if cache is not None:
+        cache.store(point, t, value)
+
+def evaluateKinematics(root, t, derivatives=True):
+    """
+    Evaluate the trajectories of all points in a body model in one pass.
+
+    Evaluating each point of a body model separately asks its parent for
+    its trajectory at every call, and the parent asks its own parent in
+    turn. Here the tree is traversed once from the root: each joint's own
+    rotation trajectory, and the root's own position trajectory, are
+    evaluated once, and everything obtained by offsetting from a parent is
+    computed from the parent's results using the same equations as
+    L{OffsetTrajectory}.
+
+    The computed offset values are also stored in the result caches of the
+    points, so subsequent calls such as C{point.acceleration(t)} made by
+    sensors at the same times do not recompute them.
+
+    @param root: Root L{Joint} of the body model or subtree to evaluate.
+        Its points must be trajectories, e.g. a L{SplinedBodyModel}.
+    @param t: Time or array of times at which to evaluate.
+    @param derivatives: Whether to evaluate velocities and accelerations.
+        If False, those fields of the results are None.
+    @return: Dict mapping each L{Point} in the tree to a L{PointKinematics}
+        tuple of its position, velocity and acceleration (3xN arrays),
+        rotation (L{Quaternion} or L{QuaternionArray}) and rotational
+        velocity and acceleration (3xN arrays).
+    """
+    results = {}
+    for point in root.preorderTraversal():
+        parent = results.get(point.parent)
+
+        if parent is not None and _offsetMethod(point, 'rotation'):
+            r = parent.rotation * point.rotationOffset
+            omega = parent.rotationalVelocity
+            alpha = parent.rotationalAcceleration
+            _storeResult(point, 'rotation', t, r)
+        else:
+            r = point.rotation(t)
+            omega = point.rotationalVelocity(t) if derivatives else None
+            alpha = point.rotationalAcceleration(t) if derivatives else None
+
+        if parent is not None and _offsetMethod(point, 'position'):
+            o = parent.rotation.rotateVector(point.positionOffset)
+            p = parent.position + o
+            _storeResult(point, 'position', t, p)
+            if derivatives:
+                pOmega = parent.rotationalVelocity
+                v = parent.velocity + vectors.cross(pOmega, o)
+                a = parent.acceleration \
+                    + vectors.cross(parent.rotationalAcceleration, o) \
+                    + vectors.dot(o, pOmega) * pOmega \
+                    - o * vectors.norm(pOmega)**2
+                _storeResult(point, 'velocity', t, v)
+                _storeResult(point, 'acceleration', t, a)
+            else:
+                v = a = None
+        else:
+            p = point.position(t)
+            v = point.velocity(t) if derivatives else None
+            a = point.acceleration(t) if derivatives else None
+
+        results[point] = PointKinematics(p, v, a, r, omega, alpha)
+    return results
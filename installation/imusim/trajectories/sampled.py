@@ -24,7 +24,7 @@ should be constructed. See L{splined}
 
 from base import PositionTrajectory, RotationTrajectory
 from imusim.maths.quaternions import Quaternion, QuaternionArray
-from imusim.utilities.caching import CacheLastValue
+from imusim.utilities.caching import CacheRecentValues
 from imusim.utilities.time_series import TimeSeries
 import imusim.maths.vectors as vectors
 import numpy as np
@@ -44,7 +44,7 @@ class SampledPositionTrajectory(PositionTrajectory):
         """
         self.positionKeyFrames = TimeSeries() if keyFrames is None else keyFrames
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def position(self, t):
         if len(self.positionKeyFrames) == 0:
             if np.ndim(t) == 0:
@@ -97,7 +97,7 @@ class SampledRotationTrajectory(RotationTrajectory):
         """
         self.rotationKeyFrames = TimeSeries() if keyFrames is None else keyFrames
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def rotation(self, t):
         if len(self.rotationKeyFrames) == 0:
             if np.ndim(t) == 0:
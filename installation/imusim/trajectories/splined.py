@@ -23,7 +23,8 @@ from imusim.trajectories.sampled import SampledPositionTrajectory, SampledRotati
 from imusim.trajectories.sampled import SampledTrajectory
 from imusim.maths.vector_splines import PartialInputVectorSpline
 from imusim.maths.quat_splines import PartialInputQuaternionBSpline
-from imusim.utilities.caching import CacheLastValue
+from imusim.maths.splines import SplineFitter
+from imusim.utilities.caching import CacheRecentValues
 from imusim.utilities.time_series import TimeSeries
 
 class SplinedPositionTrajectory(SampledPositionTrajectory):
@@ -31,19 +32,33 @@ class SplinedPositionTrajectory(SampledPositionTrajectory):
     Trajectory with position obtained by splining a sampled trajectory.
     """
 
-    def __init__(self, sampled, positionStdDev=0.001, positionSplineOrder=5, **kwargs):
+    def __init__(self, sampled, positionStdDev=0.001, positionSplineOrder=5,
+            splineFitter=None, **kwargs):
         """
         Initialise trajectory.
 
         @param sampled: position samples (L{SampledPositionTrajectory})
         @param positionStdDev: standard deviation of position samples (float)
         @param positionSplineOrder: order of B-spline used for interpolation
+        @param splineFitter: L{SplineFitter} with which to fit splines, or
+            None to fit them immediately
         """
         self.sampled = sampled
-        self._positionSpline = PartialInputVectorSpline(
-            sampled.positionKeyFrames.timestamps,
-            sampled.positionKeyFrames.values,
-            stddev=positionStdDev, order=positionSplineOrder)
+        fitter = SplineFitter() if splineFitter is None else splineFitter
+        self._positionSpline = fitter.fit(*self._positionSplineFit(sampled,
+            positionStdDev, positionSplineOrder))
+
+    @staticmethod
+    def _positionSplineFit(sampled, positionStdDev=0.001,
+            positionSplineOrder=5, **kwargs):
+        """
+        Fitting function and arguments of the position spline of a trajectory.
+
+        Takes the arguments of the constructor, so that fits can be submitted
+        to a L{SplineFitter} before the trajectory is constructed.
+        """
+        return (_fitPositionSpline, sampled.positionKeyFrames, positionStdDev,
+                positionSplineOrder)
 
     @property
     def _positionStartTime(self):
@@ -60,15 +75,15 @@ class SplinedPositionTrajectory(SampledPositionTrajectory):
         p = self.position(t)
         return TimeSeries(t, p)
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def position(self, t):
         return self._positionSpline(t, 0)
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def velocity(self, t):
         return self._positionSpline(t, 1)
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def acceleration(self, t):
         return self._positionSpline(t, 2)
 
@@ -83,7 +98,8 @@ class SplinedPositionTrajectory(SampledPositionTrajectory):
 class SplinedRotationTrajectory(SampledRotationTrajectory):
     """Trajectory with rotation obtained by splining a sampled trajectory."""
 
-    def __init__(self, sampled, smoothRotations=True, rotationStdDev=0.001, **kwargs):
+    def __init__(self, sampled, smoothRotations=True, rotationStdDev=0.001,
+            splineFitter=None, **kwargs):
         """
         Initialise trajectory.
 
@@ -91,13 +107,25 @@ class SplinedRotationTrajectory(SampledRotationTrajectory):
         @param smoothRotations: `True` to apply smoothing to rotation prior
             to splining (Bool)
         @param rotationStdDev: standard deviation of rotation samples (float)
+        @param splineFitter: L{SplineFitter} with which to fit splines, or
+            None to fit them immediately
         """
         self.sampled = sampled
-        keyFrames = sampled.rotationKeyFrames.values.unflipped()
-        if smoothRotations:
-            keyFrames = keyFrames.smoothed(stddev=rotationStdDev)
-        self._rotationSpline = PartialInputQuaternionBSpline(
-            sampled.rotationKeyFrames.timestamps, keyFrames)
+        fitter = SplineFitter() if splineFitter is None else splineFitter
+        self._rotationSpline = fitter.fit(*self._rotationSplineFit(sampled,
+            smoothRotations, rotationStdDev))
+
+    @staticmethod
+    def _rotationSplineFit(sampled, smoothRotations=True,
+            rotationStdDev=0.001, **kwargs):
+        """
+        Fitting function and arguments of the rotation spline of a trajectory.
+
+        Takes the arguments of the constructor, so that fits can be submitted
+        to a L{SplineFitter} before the trajectory is constructed.
+        """
+        return (_fitRotationSpline, sampled.rotationKeyFrames, smoothRotations,
+                rotationStdDev)
 
     @property
     def _rotationStartTime(self):
@@ -114,18 +142,25 @@ class SplinedRotationTrajectory(SampledRotationTrajectory):
         r = self.rotation(t)
         return TimeSeries(t, r)
 
-    @CacheLastValue()
+    @CacheRecentValues()
+    def _rotationSplineValues(self, t):
+        # The rotation and both its derivatives come from one evaluation.
+        # The cached tuple is shared, so its values must not be returned
+        # to callers without going through a cache that copies them.
+        return self._rotationSpline(t)
+
+    @CacheRecentValues()
     def rotation(self, t):
-        return self._rotationSpline(t)[0]
+        return self._rotationSplineValues(t)[0]
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def rotationalVelocity(self, t):
-        r, omega, alpha = self._rotationSpline(t)
+        r, omega, alpha = self._rotationSplineValues(t)
         return r.rotateVector(omega)
 
-    @CacheLastValue()
+    @CacheRecentValues()
     def rotationalAcceleration(self, t):
-        r, omega, alpha = self._rotationSpline(t)
+        r, omega, alpha = self._rotationSplineValues(t)
         return r.rotateVector(alpha)
 
     @property
@@ -148,8 +183,13 @@ class SplinedTrajectory(SplinedPositionTrajectory, SplinedRotationTrajectory):
         @param sampled: L{SampledTrajectory}
 
         Keyword arguments are passed to L{SplinedPositionTrajectory} and
-        L{SplinedRotationTrajectory} constructors.
+        L{SplinedRotationTrajectory} constructors. If a L{SplineFitter} is
+        given, the position and rotation splines are submitted to it together.
         """
+        fitter = kwargs.get('splineFitter')
+        if fitter is not None:
+            fitter.submit(*self._positionSplineFit(sampled, **kwargs))
+            fitter.submit(*self._rotationSplineFit(sampled, **kwargs))
         SplinedPositionTrajectory.__init__(self, sampled, **kwargs)
         SplinedRotationTrajectory.__init__(self, sampled, **kwargs)
 
@@ -171,3 +211,19 @@ class SplinedTrajectory(SplinedPositionTrajectory, SplinedRotationTrajectory):
     @property
     def endTime(self):
         return min(self._positionEndTime, self._rotationEndTime)
+
+def _fitPositionSpline(keyFrames, stddev, order):
+    """
+    Fit a position spline to a L{TimeSeries} of position keyframes.
+    """
+    return PartialInputVectorSpline(keyFrames.timestamps, keyFrames.values,
+            stddev=stddev, order=order)
+
+def _fitRotationSpline(keyFrames, smooth, stddev):
+    """
+    Fit a rotation spline to a L{TimeSeries} of rotation keyframes.
+    """
+    quaternions = keyFrames.values.unflipped()
+    if smooth:
+        quaternions = quaternions.smoothed(stddev=stddev)
+    return PartialInputQuaternionBSpline(keyFrames.timestamps, quaternions)
@@ -19,43 +19,133 @@ Decorators to enable caching of function results.
 # along with IMUSim.  If not, see <http://www.gnu.org/licenses/>.
 
 from functools import wraps
-from collections import defaultdict
+import weakref
+import numpy as np
 
 class CacheEntry(object):
     __slots__ = ('time', 'result')
 
-    def __init__(self):
-        self.time = -1
-        self.result = None
+    def __init__(self, time, result):
+        self.time = time
+        self.result = result
 
-class CacheLastValue(object):
+class CacheRecentValues(object):
     """
     Provides a decorator for methods of the form f(t)
-    to cache the last value
+    to cache the values for the most recently used times.
 
-    @param tolerance: tolerance to use when checking that two times are equal.
+    Values are cached separately for each object the method is called on.
+    Only weak references to the objects are held, so the cache does not
+    keep them alive. Times may be scalars or arrays; an array of times
+    matches a cached array if it has the same shape and all its times are
+    within the tolerance.
+
+    Results that have a copy method, such as arrays and quaternions, are
+    returned as copies, so that a caller modifying its result in place
+    cannot change the value returned to later callers.
+
+    @ivar hits: Number of calls answered from the cache.
+    @ivar misses: Number of calls for which the method was evaluated.
     """
 
-    def __init__(self, tolerance=1e-6):
+    def __init__(self, maxEntries=4, tolerance=1e-6):
+        """
+        @param maxEntries: maximum number of values to cache for each object.
+        @param tolerance: tolerance to use when checking that two times are
+            equal.
+        """
+        self._maxEntries = maxEntries
         self._tolerance = tolerance
-        self._cache = defaultdict(CacheEntry)
+        self._cache = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """
+        Discard all cached values and reset the statistics.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def store(self, obj, t, result):
+        """
+        Cache a value computed elsewhere as the result of the method for an
+        object at time(s) t. A copy of the result is stored, so the caller
+        remains free to modify it.
+        """
+        try:
+            entries = self._cache.setdefault(obj, [])
+        except TypeError:
+            return
+        if np.ndim(t) != 0:
+            t = np.array(t)
+        if len(entries) >= self._maxEntries:
+            del entries[0]
+        entries.append(CacheEntry(t, _copyResult(result)))
 
     def __call__(self, method):
         tolerance = self._tolerance
-        closure_abs = abs
+        maxEntries = self._maxEntries
         cache = self._cache
 
         @wraps(method)
         def checkcache(obj, t):
-            cacheEntry = cache[obj]
             try:
-                if closure_abs(t - cacheEntry.time) < tolerance:
-                    return cacheEntry.result
-                cacheEntry.time = t
-                cacheEntry.result = method(obj, t)
-                return cacheEntry.result
-            except:
+                entries = cache[obj]
+            except KeyError:
+                entries = cache[obj] = []
+            except TypeError:
+                # Objects that cannot be weakly referenced are not cached.
                 return method(obj, t)
+
+            if np.ndim(t) == 0:
+                for entry in reversed(entries):
+                    if np.ndim(entry.time) == 0 \
+                            and abs(t - entry.time) < tolerance:
+                        break
+                else:
+                    entry = None
+            else:
+                shape = np.shape(t)
+                for entry in reversed(entries):
+                    if np.shape(entry.time) == shape \
+                            and np.all(np.abs(t - entry.time) < tolerance):
+                        break
+                else:
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+                if np.ndim(t) != 0:
+                    # Keep a copy in case the caller modifies its array.
+                    t = np.array(t)
+                entry = CacheEntry(t, method(obj, t))
+                if len(entries) >= maxEntries:
+                    del entries[0]
+            else:
+                self.hits += 1
+                entries.remove(entry)
+            entries.append(entry)
+            return _copyResult(entry.result)
+
+        checkcache.cache = self
         return checkcache
 
+def _copyResult(result):
+    """
+    Copy a cached result if it is a mutable object with a copy method.
+    """
+    copy = getattr(result, 'copy', None)
+    return result if copy is None else copy()
+
+class CacheLastValue(CacheRecentValues):
+    """
+    Provides a decorator for methods of the form f(t)
+    to cache the last value
 
+    @param tolerance: tolerance to use when checking that two times are equal.
+    """
+
+    def __init__(self, tolerance=1e-6):
+        CacheRecentValues.__init__(self, 1, tolerance)
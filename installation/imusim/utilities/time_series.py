@@ -23,7 +23,7 @@ from collections import namedtuple
 import numbers
 from copy import copy
 import itertools
-from imusim.maths.quaternions import Quaternion, QuaternionArray
+from imusim.maths.quaternions import Quaternion, QuaternionArray, slerp
 
 class TimeSeries(object):
     """
@@ -34,8 +34,22 @@ class TimeSeries(object):
     Each value may have a (co)variance associated with it.
 
     Timestamps may be irregularly spaced but must be monotonically increasing.
+
+    Data is held in arrays whose capacity doubles whenever they fill, so
+    adding a value takes amortised constant time, and the L{timestamps},
+    L{values} and L{variances} properties return views of these arrays
+    without copying. Arrays passed to the constructor are used as the
+    initial storage without being copied.
+
+    Values between samples can be obtained with L{interpolate}. Lookups
+    remember where the last query time fell, so that series queried at
+    increasing times, as when resampling to a common time base, are not
+    searched from the start for every query.
     """
 
+    #: Capacity of the storage arrays allocated when the first value is added.
+    INITIAL_CAPACITY = 16
+
     def __init__(self, timestamps=None, values=None, variances=None):
         """
         Construct time series.
@@ -54,19 +68,45 @@ class TimeSeries(object):
         if (timestamps is None) != (values is None):
             raise ValueError, "Both or neither of timestamps and values must be provided"
         self._dtype = None
-        self._timestampsArray = None
-        self._valuesArray = None
-        self._variancesArray = None
+        self._length = 0
+        self._hasVariances = False
+        self._cursor = 0
         if timestamps is not None:
-            assert all(np.diff(timestamps) > 0), "Timestamps must be in order"
-            if len(np.shape(values)) == 1:
-                values = list(np.asarray(values))
+            timestamps = np.asarray(timestamps, dtype=float)
+            assert np.all(np.diff(timestamps) > 0), "Timestamps must be in order"
+            if len(timestamps) == 0:
+                return
+            if isinstance(values, QuaternionArray):
+                self._initTypes(values[0])
+                values = values.array
+            elif len(np.shape(values)) == 1:
+                values = np.asarray(values)
+                if isinstance(values[0], Quaternion):
+                    values = QuaternionArray(list(values)).array
+                    self._initTypes(Quaternion())
+                else:
+                    self._initTypes(values[0])
+            elif len(np.shape(values)) == 2:
+                values = np.asarray(values)
+                self._initTypes(values[:,:1])
             else:
                 values = list(np.asarray(np.hsplit(values, values.shape[-1])))
-            if variances is not None:
+                if variances is None:
+                    variances = itertools.repeat(None)
                 [self.add(t,v,V) for t,v,V in zip(timestamps, values, variances)]
-            else:
-                [self.add(t,v) for t,v in zip(timestamps, values)]
+                return
+            assert self._sampleCount(values) == len(timestamps), \
+                    "Number of values must match number of timestamps"
+            self._timestampsBuffer = timestamps
+            self._valuesBuffer = values
+            if variances is not None:
+                variances = np.asarray(variances)
+                assert variances.shape == \
+                        (len(timestamps),) + self._varianceShape(), \
+                        "Variance shape must match series dimensions"
+                self._hasVariances = True
+                self._variancesBuffer = variances
+            self._length = len(timestamps)
 
     def __getstate__(self):
         if self._hasVariances:
@@ -78,10 +118,7 @@ class TimeSeries(object):
         self.__init__(*state)
 
     def __len__(self):
-        if self._dtype is None:
-            return 0
-        else:
-            return len(self._timestamps)
+        return self._length
 
     def _initTypes(self, value):
         self._dtype = type(value)
@@ -93,6 +130,9 @@ class TimeSeries(object):
             self._dims = 4
         else:
             self._dims = 1
+        # Column vectors are stored side by side, as returned by L{values}.
+        self._columns = issubclass(self._dtype, np.ndarray) \
+                and len(self._dshape) == 2 and self._dshape[1] == 1
 
     def _varianceShape(self):
         if self._dims == 1:
@@ -100,6 +140,61 @@ class TimeSeries(object):
         else:
             return (self._dims, self._dims)
 
+    def _sampleCount(self, values):
+        return values.shape[1] if self._columns else len(values)
+
+    def _emptyValues(self, value, capacity):
+        """
+        Allocate storage for values like the given value.
+        """
+        if self._dtype is Quaternion:
+            return np.empty((capacity, 4))
+        value = np.asarray(value)
+        dtype = value.dtype if value.dtype.kind in 'biufc' else object
+        if self._columns:
+            return np.empty((self._dims, capacity), dtype)
+        else:
+            return np.empty((capacity,) + value.shape, dtype)
+
+    @staticmethod
+    def _resized(array, capacity, axis=0):
+        """
+        Copy an array into a new array with the given capacity along an axis.
+        """
+        shape = list(array.shape)
+        index = [slice(None)] * array.ndim
+        index[axis] = slice(0, shape[axis])
+        shape[axis] = capacity
+        result = np.empty(shape, array.dtype)
+        result[tuple(index)] = array
+        return result
+
+    def _reserve(self, length):
+        """
+        Ensure the storage arrays can hold at least the given number of values.
+        """
+        capacity = len(self._timestampsBuffer)
+        if length <= capacity:
+            return
+        capacity = max(length, 2 * capacity)
+        self._timestampsBuffer = self._resized(self._timestampsBuffer, capacity)
+        self._valuesBuffer = self._resized(self._valuesBuffer, capacity,
+                1 if self._columns else 0)
+        if self._hasVariances:
+            self._variancesBuffer = self._resized(self._variancesBuffer,
+                    capacity)
+
+    def _value(self, index):
+        """
+        Obtain the value at an index in the same form as it was added.
+        """
+        if self._dtype is Quaternion:
+            return Quaternion(*self._valuesBuffer[index])
+        elif self._columns:
+            return self._valuesBuffer[:,index:index+1].copy()
+        else:
+            return copy(self._valuesBuffer[index])
+
     @property
     def dtype(self):
         """
@@ -112,17 +207,9 @@ class TimeSeries(object):
         """
         Array of times at which the values were taken.
         """
-        if self._timestampsArray is None:
-            self._timestampsArray = np.array(self._timestamps)
-        return self._timestampsArray
-
-    def _makeValuesArray(self, values):
-        if self.dtype is Quaternion:
-            return QuaternionArray(values)
-        elif issubclass(self._dtype, np.ndarray) and len(self._dshape) == 2 and self._dshape[1] == 1:
-            return np.hstack(values)
-        else:
-            return np.array(values)
+        if self._dtype is None:
+            return np.empty(0)
+        return self._timestampsBuffer[:self._length]
 
     @property
     def values(self):
@@ -133,9 +220,15 @@ class TimeSeries(object):
         vectors, or is a L{QuaternionArray} of length N for quaternions,
         where N is the number of values.
         """
-        if self._valuesArray is None:
-            self._valuesArray = self._makeValuesArray(self._values)
-        return self._valuesArray
+        if self._dtype is None:
+            return np.empty(0)
+        elif self._dtype is Quaternion:
+            return QuaternionArray(self._valuesBuffer[:self._length],
+                    copy=False)
+        elif self._columns:
+            return self._valuesBuffer[:,:self._length]
+        else:
+            return self._valuesBuffer[:self._length]
 
     @property
     def variances(self):
@@ -150,9 +243,41 @@ class TimeSeries(object):
             variances = np.empty(shape)
             variances[:] = np.nan
             return variances
-        if self._variancesArray is None:
-            self._variancesArray = np.array(self._variances)
-        return self._variancesArray
+        return self._variancesBuffer[:self._length]
+
+    def _indices(self, t):
+        """
+        Find the index of the latest sample at or before each time.
+
+        The index found for the last query time is kept as a cursor. A single
+        time in one of the two sample intervals following the cursor is found
+        without searching, and increasing query times after the cursor are
+        only searched for among the following samples.
+        """
+        timestamps = self.timestamps
+        cursor = self._cursor
+        t = np.asarray(t)
+        if len(timestamps) == 0 or not t.size or \
+                not (np.min(t) >= timestamps[cursor]):
+            indices = np.searchsorted(timestamps, t, 'right') - 1
+        elif t.ndim == 0:
+            following = cursor + 1
+            if following == len(timestamps) or t < timestamps[following]:
+                indices = cursor
+            elif following + 1 == len(timestamps) \
+                    or t < timestamps[following + 1]:
+                indices = following
+            else:
+                indices = following + np.searchsorted(
+                        timestamps[following + 1:], t, 'right')
+        elif np.all(np.diff(t.ravel()) >= 0):
+            indices = cursor + np.searchsorted(timestamps[cursor:], t,
+                    'right') - 1
+        else:
+            indices = np.searchsorted(timestamps, t, 'right') - 1
+        if t.size:
+            self._cursor = max(int(np.ravel(indices)[-1]), 0)
+        return indices
 
     def __call__(self, t, returnVariance=False):
         """
@@ -160,8 +285,8 @@ class TimeSeries(object):
 
         If returnVariance is True then the value and variance are returned.
         """
-        indices = np.searchsorted(self.timestamps, t, 'right') - 1
-        if issubclass(self._dtype, np.ndarray) and len(self._dshape) == 2 and self._dshape[1] == 1:
+        indices = self._indices(t)
+        if self._columns:
             values = self.values[:,np.atleast_1d(indices)]
         else:
             values = self.values[indices]
@@ -170,20 +295,57 @@ class TimeSeries(object):
         else:
             if not self._hasVariances:
                 raise ValueError, "This time series has no variance data."
-            return values, np.array(self._variances[indices])
+            return values, self.variances[indices]
+
+    def interpolate(self, t):
+        """
+        Obtain values interpolated between samples at time(s) t.
+
+        Scalar and vector values are interpolated linearly. Quaternion values
+        are interpolated using spherical linear interpolation (SLERP).
+
+        @param t: Time or array of times at which to interpolate.
+        @return: Values in the same form as returned by L{__call__}. Values
+            at times outside the span of the series are NaN.
+        """
+        if len(self) == 0:
+            raise ValueError, "Cannot interpolate an empty time series."
+        scalar = np.ndim(t) == 0
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        timestamps = self.timestamps
+        indices = np.atleast_1d(self._indices(t))
+        valid = (indices >= 0) & (t <= timestamps[-1])
+        indices = np.clip(indices, 0, max(len(timestamps) - 2, 0))
+        following = np.minimum(indices + 1, len(timestamps) - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = np.where(following > indices,
+                (t - timestamps[indices]) /
+                    (timestamps[following] - timestamps[indices]), 0)
+        u[~valid] = np.nan
+
+        values = self.values
+        if self._dtype is Quaternion:
+            result = slerp(values[indices], values[following], u)
+            return result[0] if scalar else result
+        elif self._columns:
+            return values[:,indices] * (1 - u) + values[:,following] * u
+        else:
+            u = u.reshape((-1,) + (1,) * (values.ndim - 1))
+            result = values[indices] * (1 - u) + values[following] * u
+            return result[0] if scalar else result
 
     def __iter__(self):
-        return itertools.izip(self._timestamps, self._values, self._variances)
+        values = (self._value(i) for i in xrange(len(self)))
+        return itertools.izip(self.timestamps, values, self.variances)
 
     def add(self, time, value, variance=None):
         """
         Add a timestamped value to the data.
 
         @param time: Time at which the value was taken.
-        @param value: Value to store. The value must support the __copy__
-            operation as used by the copy module.
-        @param variance: (Co)variance of the value. The variance must support
-            the __copy__ operation as used by the copy module.
+        @param value: Value to store. The value is copied into the storage
+            of the time series.
+        @param variance: (Co)variance of the value.
         """
         if isinstance(value, np.matrix):
             value = np.asarray(value)
@@ -191,55 +353,59 @@ class TimeSeries(object):
             value = value[0]
         if self._dtype is None:
             self._initTypes(value)
-            self._timestamps = [time]
-            self._values = [value]
+            self._timestampsBuffer = np.empty(self.INITIAL_CAPACITY)
+            self._valuesBuffer = self._emptyValues(value,
+                    self.INITIAL_CAPACITY)
             if variance is not None:
                 self._hasVariances = True
-                assert np.shape(variance) == self._varianceShape(), \
-                        "Variance shape must match series dimensions"
-                self._variances = [variance]
-            else:
-                self._hasVariances = False
+                self._variancesBuffer = np.empty(
+                        (self.INITIAL_CAPACITY,) + self._varianceShape())
         else:
             assert time > self.latestTime, \
                     "Time must be after existing entries"
-            self._timestamps.append(copy(time))
             assert type(value) == self._dtype, \
                     "Data type must match series data type"
             assert np.shape(value) == self._dshape, \
                     "Data shape must match series data shape"
-            if self._dims > 1 and self._dtype != Quaternion:
-                value = np.asarray(value)
-            self._values.append(copy(value))
-            if self._hasVariances:
-                assert np.shape(variance) == self._varianceShape(), \
-                        "Variance shape must match series dimensions"
-                if self._dims > 1:
-                    variance = np.asarray(variance)
-                self._variances.append(copy(variance))
+        if self._hasVariances:
+            assert np.shape(variance) == self._varianceShape(), \
+                    "Variance shape must match series dimensions"
 
-        self._latestTime = time
-        self._latestValue = value
-        self._timestampsArray = None
-        self._valuesArray = None
-        self._variancesArray = None
+        index = self._length
+        self._reserve(index + 1)
+        self._timestampsBuffer[index] = time
+        if self._dtype is Quaternion:
+            self._valuesBuffer[index] = value.components
+        else:
+            if self._valuesBuffer.dtype != object:
+                dtype = np.asarray(value).dtype
+                if not np.can_cast(dtype, self._valuesBuffer.dtype):
+                    self._valuesBuffer = self._valuesBuffer.astype(
+                            np.result_type(dtype, self._valuesBuffer.dtype))
+            if self._columns:
+                self._valuesBuffer[:,index] = value[:,0]
+            else:
+                self._valuesBuffer[index] = value
+        if self._hasVariances:
+            self._variancesBuffer[index] = variance
+        self._length += 1
 
     @property
     def earliestTime(self):
         """ The earliest time stamp in this time series. """
-        return self._timestamps[0]
+        return self.timestamps[0]
 
     @property
     def earliestValue(self):
         """ The earliest value in this time series. """
-        return self._values[0]
+        return self._value(0)
 
     @property
     def latestTime(self):
         """ The latest time stamp in this time series. """
-        return self._timestamps[-1]
+        return self.timestamps[-1]
 
     @property
     def latestValue(self):
         """ The latest value in this time series. """
-        return self._values[-1]
+        return self._value(self._length - 1)
@@ -55,30 +55,38 @@ int main(int argc, char **argv) {
         }
     }
 
-    // Read in the frames.
-    // triangles[frame][triangle][vector (x3)]
-    vector *** triangles = new vector**[anim_length];
+    // Read in the frames. BodySim saves the vertex indices of every triangle
+    // once, as an int32 array indexed by [triangle][corner], and the vertex
+    // locations of every frame as a float32 array indexed by
+    // [frame][vertex][dimension]. The frames may start before frame_start,
+    // e.g. when they were generated for a whole batch.
+    // triangles[triangle * 3 + corner], vertices[frame][vertex]
+    std::string triangles_header_str = frame_path + "triangles.xml";
+    int triangles_frame_start = read_xml_int_attribute(triangles_header_str, "frame_start");
+    int triangles_frame_end = read_xml_int_attribute(triangles_header_str, "frame_end");
+    int vertex_count = read_xml_int_attribute(triangles_header_str, "vertex_count");
+    if(triangles_frame_start < 0 || triangles_frame_start > frame_start ||
+       triangles_frame_end < frame_end || vertex_count < 0 ||
+       read_xml_int_attribute(triangles_header_str, "triangle_count") != triangle_count) {
+        std::cerr << "Triangles in " << frame_path << " do not cover the simulation." << std::endl;
+        return 1;
+    }
+
+    int * triangles = (int *) load_npy(frame_path + "triangles.npy", "<i4",
+                                       (long) triangle_count * 3, sizeof(int));
+    long triangles_frame_count = triangles_frame_end - triangles_frame_start + 1;
+    float * vertex_data = (float *) load_npy(frame_path + "vertices.npy", "<f4",
+                                             triangles_frame_count * vertex_count * 3,
+                                             sizeof(float));
+    if(triangles == 0 || vertex_data == 0) {
+        std::cerr << "Could not read triangles in " << frame_path << std::endl;
+        return 1;
+    }
+
+    vector ** vertices = new vector*[anim_length];
     for(int i = 0; i < anim_length; i++) {
-        std::stringstream ss;
-        std::string frame_number_str;
-        ss << (i + frame_start);
-        ss >> frame_number_str;
-        std::string frame_line;
-        std::string frame_file_str = frame_path + "frame" + frame_number_str + ".csv";
-        std::ifstream frame_file(frame_file_str.c_str());
-        triangles[i] = new vector*[triangle_count];
-        for(int j = 0; j < triangle_count; j++) {
-            triangles[i][j] = new vector[3];
-            getline(frame_file, frame_line);
-            int delim_pos = frame_line.find(DELIMITER);
-            for(int k = 0; k < 3; k++) {
-                for(int l = 0; l < 3; l++) {
-                    triangles[i][j][k][l] = atof(frame_line.substr(0, delim_pos).c_str());
-                    frame_line = frame_line.substr(delim_pos + 1);
-                    delim_pos = frame_line.find(DELIMITER);
-                }
-            }
-        }
+        long frame_offset = (long) (i + frame_start - triangles_frame_start) * vertex_count;
+        vertices[i] = (vector *) (vertex_data + frame_offset * 3);
     }
 
     // Create sphere.
@@ -117,8 +125,10 @@ int main(int argc, char **argv) {
                 ADDV(offsetSphere, spheres_sample_points[k], sensor_locs[i][j]);
                 SUBV(ray, offsetSphere, sensor_locs[i][j]);
                 for(int l = 0; l < triangle_count; l++) {
-                    result = intersect_ray_tri(triangles[j][l][0], triangles[j][l][1],
-                                      triangles[j][l][2], ray, sensor_locs[i][j]);
+                    result = intersect_ray_tri(vertices[j][triangles[l * 3]],
+                                                  vertices[j][triangles[l * 3 + 1]],
+                                                  vertices[j][triangles[l * 3 + 2]],
+                                                  ray, sensor_locs[i][j]);
                     if(result != 0) {
                         res_vect[0] = result[0]; res_vect[1] = result[1]; res_vect[2] = result[2];
                         if(isInBetw(res_vect, sensor_locs[i][j], offsetSphere))  {
@@ -143,8 +153,10 @@ int main(int argc, char **argv) {
                 SUBV(ray, sensor_locs[k][j], sensor_locs[i][j]);
                 bool has_los = true;
                 for(int l = 0; l < triangle_count; l++) {
-                    result = intersect_ray_tri(triangles[j][l][0], triangles[j][l][1],
-                                               triangles[j][l][2], ray, sensor_locs[i][j]);
+                    result = intersect_ray_tri(vertices[j][triangles[l * 3]],
+                                               vertices[j][triangles[l * 3 + 1]],
+                                               vertices[j][triangles[l * 3 + 2]],
+                                               ray, sensor_locs[i][j]);
                     if(result != 0) {
                         res_vect[0] = result[0]; res_vect[1] = result[1]; res_vect[2] = result[2];
                         if(isInBetw(res_vect, sensor_locs[i][j], sensor_locs[k][j]))  {
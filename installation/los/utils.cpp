@@ -1,7 +1,12 @@
 // Utilities for LOS calculations.
 
 #include "vectmath.h"
+#include "utils.h"
 #include <math.h>
+#include <stdlib.h>
+#include <fstream>
+#include <sstream>
+#include <string>
 
 // M_PI is not defined when compiled with mingw.
 #ifndef M_PI
@@ -74,4 +79,57 @@ void sphere_samples(vector * result, int num_points, float radius) {
         z = z - dz;
         longitude = longitude + dlong;
     }
-}
\ No newline at end of file
+}
+// Loads an array saved with numpy.save, expected to hold count values of
+// item_size bytes with the numpy type descr (e.g. "<f4"). Returns 0 if the file
+// cannot be read or holds other data.
+void * load_npy(std::string path, std::string descr, long count, int item_size) {
+    std::ifstream npy_file(path.c_str(), std::ios::in | std::ios::binary);
+    char magic[6];
+    unsigned char version[2];
+    if(!npy_file.read(magic, 6) || magic[0] != (char) 0x93 ||
+       std::string(magic + 1, 5) != "NUMPY") {
+        return 0;
+    }
+
+    // Version 1 stores the header length in 2 bytes, later versions in 4.
+    npy_file.read((char *) version, 2);
+    int length_size = version[0] == 1 ? 2 : 4;
+    unsigned char length_bytes[4] = {0, 0, 0, 0};
+    npy_file.read((char *) length_bytes, length_size);
+    unsigned long header_length = 0;
+    for(int i = length_size - 1; i >= 0; i--) {
+        header_length = (header_length << 8) | length_bytes[i];
+    }
+
+    std::string header(header_length, ' ');
+    npy_file.read(&header[0], header_length);
+    if(header.find("'" + descr + "'") == std::string::npos ||
+       header.find("'fortran_order': False") == std::string::npos) {
+        return 0;
+    }
+
+    char * data = new char[count * item_size];
+    if(!npy_file.read(data, count * item_size)) {
+        delete [] data;
+        return 0;
+    }
+
+    return data;
+}
+
+// Reads an integer attribute from a single element xml file written by
+// BodySim. Returns -1 if the attribute cannot be found.
+int read_xml_int_attribute(std::string path, std::string name) {
+    std::ifstream xml_file(path.c_str());
+    std::stringstream contents;
+    contents << xml_file.rdbuf();
+    std::string xml = contents.str();
+    std::string key = name + "=\"";
+    size_t pos = xml.find(key);
+    if(pos == std::string::npos) {
+        return -1;
+    }
+
+    return atoi(xml.substr(pos + key.size()).c_str());
+}
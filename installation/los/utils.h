@@ -1,10 +1,16 @@
 #ifndef __UTILS_H__
 #define __UTILS_H__
 
+#include <string>
+
 float * intersect_ray_tri(vector v1, vector v2, vector v3, vector ray, vector origin);
 
 bool isInBetw(vector pt, vector begin, vector end);
 
 void sphere_samples(vector * result, int num_points, float radius);
 
+void * load_npy(std::string path, std::string descr, long count, int item_size);
+
+int read_xml_int_attribute(std::string path, std::string name);
+
 #endif
\ No newline at end of file